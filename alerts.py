@@ -0,0 +1,229 @@
+"""Barramento de alertas: publish() nunca bloqueia a detecção; cada destino tem seu worker.
+
+O caminho de detecção chama AlertBus.publish(câmera, pessoas). O evento vai para a
+fila de cada destino (sink) e, se a fila estiver cheia, é descartado e contado. O
+worker do destino junta os eventos que chegam dentro de 'coalesce_s' segundos do
+primeiro (e os que chegam enquanto espera o limite de taxa) numa única notificação,
+e só envia quando o balde de fichas (token bucket) tem ficha: uma rajada de
+detecções em várias câmeras vira um aviso por janela.
+
+Destinos em "alert_sinks" no config.json (padrão: só o som):
+    {"type": "sound"}                                      winsound no Windows, bipe nos demais
+    {"type": "webhook", "url": "http://127.0.0.1:9000/"}   POST com o JSON da notificação
+    {"type": "script", "command": ["/caminho/script.sh"]}  JSON no stdin e ALERT_* no ambiente
+    {"type": "file", "directory": "alertas"}               um arquivo .json por notificação
+Opções de todos os destinos:
+    rate_per_minute  fichas repostas por minuto (padrão 60 / alert_cooldown, ou 6)
+    burst            fichas acumuláveis (padrão 1)
+    coalesce_s       janela de agrupamento em segundos (padrão 2)
+    queue_size       eventos pendentes antes de descartar (padrão 100)
+    timeout          segundos para webhook e script (padrão 5)
+"""
+import abc
+import collections
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import urllib.request
+
+try:
+    import winsound  # Só existe no Windows
+except ImportError:
+    winsound = None
+
+AlertEvent = collections.namedtuple("AlertEvent", "camera people timestamp")
+
+
+class TokenBucket:
+    """Limite de taxa: 'rate' fichas por segundo, até 'burst' acumuladas."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self):
+        """Segundos até haver uma ficha (0 se já houver)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def summarize(events):
+    """Notificação única para um grupo de eventos."""
+    people = collections.Counter()
+    for event in events:
+        people[event.camera] += event.people
+    cameras = ", ".join(f"{camera} ({count})" for camera, count in people.items())
+    return {
+        "message": f"ALERTA: {sum(people.values())} pessoa(s) detectada(s) em {cameras}!",
+        "cameras": dict(people),
+        "events": len(events),
+        "first": min(event.timestamp for event in events),
+        "last": max(event.timestamp for event in events),
+    }
+
+
+class Sink(threading.Thread, abc.ABC):
+    """Destino de alertas com fila, agrupamento e limite de taxa próprios."""
+
+    def __init__(self, options, default_rate):
+        super().__init__(daemon=True)
+        self.options = options
+        self.coalesce = options.get("coalesce_s", 2)
+        self.timeout = options.get("timeout", 5)
+        self.bucket = TokenBucket(options.get("rate_per_minute", default_rate) / 60, options.get("burst", 1))
+        self.events = queue.Queue(options.get("queue_size", 100))
+        self.stop_event = threading.Event()
+        # Métricas
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def offer(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, batch, until):
+        """Junta na lista os eventos que chegarem até 'until' (monotônico)."""
+        while not self.stop_event.is_set():
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.events.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                batch = [self.events.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            self._drain(batch, time.monotonic() + self.coalesce)
+            # Sem ficha, continua juntando até poder enviar
+            while not self.stop_event.is_set() and not self.bucket.take():
+                self._drain(batch, time.monotonic() + self.bucket.wait_time())
+            if self.stop_event.is_set():
+                break
+            self.coalesced += len(batch) - 1
+            try:
+                self.send(summarize(batch))
+                self.sent += 1
+            except Exception as error:  # um destino com problema não derruba os outros
+                self.errors += 1
+                print(f"[{self.name}] Falha ao enviar alerta: {error}")
+
+    @abc.abstractmethod
+    def send(self, notification):
+        """Entrega uma notificação; exceções contam como erro do destino."""
+
+    def metrics(self):
+        return {"sent": self.sent, "coalesced": self.coalesced, "dropped": self.dropped,
+                "errors": self.errors, "pending": self.events.qsize()}
+
+
+class SoundSink(Sink):
+    def __init__(self, options, default_rate, on_sound=None):
+        super().__init__(options, default_rate)
+        self.on_sound = on_sound
+
+    def send(self, notification):
+        print(notification["message"])
+        if winsound is not None:
+            winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS | winsound.SND_ASYNC)
+        elif self.on_sound is not None:
+            self.on_sound()
+        else:
+            print("\a", end="", flush=True)
+
+
+class WebhookSink(Sink):
+    def send(self, notification):
+        request = urllib.request.Request(self.options["url"], data=json.dumps(notification).encode(),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class ScriptSink(Sink):
+    def send(self, notification):
+        command = self.options["command"]
+        env = dict(os.environ, ALERT_MESSAGE=notification["message"],
+                   ALERT_CAMERAS=",".join(notification["cameras"]),
+                   ALERT_PEOPLE=str(sum(notification["cameras"].values())))
+        subprocess.run(command if isinstance(command, list) else [command], input=json.dumps(notification).encode(),
+                       env=env, timeout=self.timeout, check=True, stdout=subprocess.DEVNULL)
+
+
+class FileSink(Sink):
+    def send(self, notification):
+        directory = self.options.get("directory", "alertas")
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(notification["last"])) + f"-{self.sent:04d}.json"
+        path = os.path.join(directory, name)
+        # Grava num temporário e renomeia: quem vigia o diretório nunca vê um arquivo pela metade
+        with open(path + ".tmp", 'w', encoding="utf-8") as f:
+            json.dump(notification, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+SINK_TYPES = {"sound": SoundSink, "webhook": WebhookSink, "script": ScriptSink, "file": FileSink}
+
+
+class AlertBus:
+    def __init__(self, config=None, on_sound=None):
+        config = config or {}
+        # O antigo alert_cooldown vira a taxa padrão: um aviso a cada N segundos
+        default_rate = 60 / config.get("alert_cooldown", 10)
+        self.sinks = []
+        for index, options in enumerate(config.get("alert_sinks", [{"type": "sound"}])):
+            sink_type = options.get("type")
+            if sink_type not in SINK_TYPES:
+                raise ValueError(f"Destino de alerta desconhecido: {sink_type}")
+            if sink_type == "sound":
+                sink = SoundSink(options, default_rate, on_sound)
+            else:
+                sink = SINK_TYPES[sink_type](options, default_rate)
+            sink.name = f"alert-{index + 1}-{sink_type}"
+            self.sinks.append(sink)
+        self.published = 0
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def stop(self):
+        for sink in self.sinks:
+            sink.stop_event.set()
+        for sink in self.sinks:
+            sink.join(timeout=1)
+
+    def publish(self, camera, people=1, timestamp=None):
+        """Entrega o evento a todos os destinos sem esperar nenhum deles."""
+        event = AlertEvent(camera, people, timestamp or time.time())
+        self.published += 1
+        for sink in self.sinks:
+            sink.offer(event)
+
+    def metrics(self):
+        return {"published": self.published, **{sink.name: sink.metrics() for sink in self.sinks}}
@@ -0,0 +1,90 @@
+"""Exercita o barramento de alertas contra um servidor HTTP local de teste.
+
+Sobe um servidor em 127.0.0.1 que só registra os POSTs recebidos (e demora
+--server-delay segundos para responder, como um webhook lento), configura um
+destino webhook e um de arquivo e publica uma rajada de eventos de várias câmeras.
+Mostra quanto publish() chegou a bloquear o chamador (deve ficar em microssegundos,
+mesmo com o servidor lento) e quantas notificações cada destino entregou, agrupou
+ou descartou.
+
+Uso:
+    python benchmarks/bench_alert_bus.py
+    python benchmarks/bench_alert_bus.py --events 500 --cameras 4 --server-delay 1 --rate 30
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from alerts import AlertBus  # noqa: E402
+
+
+def stub_server(delay):
+    """Servidor que guarda o corpo de cada POST em server.received."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self.server.received.append(json.loads(body))
+            self.send_response(204)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.received = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--cameras', type=int, default=3)
+    parser.add_argument('--duration', type=float, default=5, help="segundos em que a rajada é espalhada")
+    parser.add_argument('--rate', type=float, default=60, help="rate_per_minute dos destinos")
+    parser.add_argument('--coalesce', type=float, default=1, help="coalesce_s dos destinos")
+    parser.add_argument('--server-delay', type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = stub_server(args.server_delay)
+    directory = tempfile.mkdtemp(prefix="alertas_")
+    common = {"rate_per_minute": args.rate, "coalesce_s": args.coalesce}
+    bus = AlertBus({"alert_sinks": [
+        dict(common, type="webhook", url=f"http://127.0.0.1:{server.server_address[1]}/"),
+        dict(common, type="file", directory=directory),
+    ]})
+    bus.start()
+
+    blocked = []
+    interval = args.duration / args.events
+    for i in range(args.events):
+        start = time.perf_counter()
+        bus.publish(f"camera{i % args.cameras + 1}")
+        blocked.append((time.perf_counter() - start) * 1e6)
+        time.sleep(interval)
+    # Tempo para a última janela de agrupamento fechar e ser entregue
+    time.sleep(args.coalesce + 60 / args.rate + args.server_delay + 0.5)
+    metrics = bus.metrics()
+    bus.stop()
+    server.shutdown()
+
+    blocked.sort()
+    print(f"publish(): p50 {blocked[len(blocked) // 2]:.0f} us, máx {blocked[-1]:.0f} us "
+          f"({metrics.pop('published')} eventos)")
+    print(f"{'destino':>18}{'enviadas':>10}{'agrupados':>11}{'descartados':>13}{'erros':>7}")
+    for name, values in metrics.items():
+        print(f"{name:>18}{values['sent']:>10}{values['coalesced']:>11}{values['dropped']:>13}{values['errors']:>7}")
+    people = sum(sum(notification["cameras"].values()) for notification in server.received)
+    print(f"servidor recebeu {len(server.received)} notificação(ões) cobrindo {people} pessoa(s)")
+    print(f"arquivos em {directory}: {len([n for n in os.listdir(directory) if n.endswith('.json')])}")
+
+
+if __name__ == "__main__":
+    main()
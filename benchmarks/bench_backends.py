@@ -0,0 +1,66 @@
+"""Compara variantes do modelo: formato, backend/target e tamanho de entrada.
+
+Para cada variante mostra o tempo de carga, o do aquecimento (primeiro forward) e
+a mediana de ms por quadro depois dele, com o número de threads pedido. Variantes
+cujo arquivo não existe, ou que o OpenCV instalado não suporta, aparecem como
+indisponíveis.
+
+Uso:
+    python benchmarks/bench_backends.py --sizes 300 256 224 --threads 1
+    python benchmarks/bench_backends.py --format onnx --model-path MobileNetSSD.onnx
+    python benchmarks/bench_backends.py --format openvino --model-path ssd_int8.xml --model-config ssd_int8.bin
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection import Detector, model_files_exist  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', default="caffe", choices=["caffe", "onnx", "openvino"])
+    parser.add_argument('--model-path')
+    parser.add_argument('--model-config')
+    parser.add_argument('--backends', nargs='+', default=["default"])
+    parser.add_argument('--targets', nargs='+', default=["cpu"])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[300, 256, 224])
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    frame = np.random.default_rng(0).integers(0, 255, (360, 640, 3), dtype=np.uint8)
+
+    print(f"{'backend':>10}{'target':>13}{'entrada':>9}{'carga ms':>10}{'aquec. ms':>11}{'ms/quadro':>11}")
+    for backend in args.backends:
+        for target in args.targets:
+            for size in args.sizes:
+                config = {"model_format": args.format, "model_path": args.model_path,
+                          "model_config": args.model_config, "input_size": size,
+                          "dnn_backend": backend, "dnn_target": target}
+                label = f"{backend:>10}{target:>13}{size:>9}"
+                if not model_files_exist(config):
+                    print(f"{label}  arquivos do modelo não encontrados")
+                    continue
+                try:
+                    detector = Detector(config)
+                except cv2.error as error:
+                    print(f"{label}  indisponível ({str(error).strip().splitlines()[-1]})")
+                    continue
+                timings = []
+                for _ in range(args.iterations):
+                    start = time.perf_counter()
+                    detector.detect(frame)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(f"{label}{detector.load_ms:>10.0f}{detector.warmup_ms:>11.0f}{statistics.median(timings):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
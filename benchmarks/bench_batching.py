@@ -0,0 +1,59 @@
+"""Varre o tamanho do lote da inferência: latência contra vazão.
+
+Para cada tamanho de lote roda detect_batch() repetidas vezes sobre quadros
+sintéticos e mostra a latência do forward, o custo por quadro e os quadros/s de um
+núcleo. A coluna 'espera' estima quanto um quadro aguardaria o lote encher com a
+taxa agregada informada (limitada por --max-wait-ms), e 'latência' soma as duas.
+
+Uso:
+    python benchmarks/bench_batching.py --sizes 1 2 4 8 16 --rate 8 --max-wait-ms 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection import INPUT_SIZE, load_net, detect_batch, model_files_exist  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=8, help="quadros/s somando todas as câmeras")
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--threads', type=int, default=1, help="threads do OpenCV (1 = custo por núcleo)")
+    args = parser.parse_args()
+
+    if not model_files_exist():
+        raise SystemExit("Arquivos do modelo de IA não encontrados (MobileNetSSD_deploy.caffemodel).")
+
+    cv2.setNumThreads(args.threads)
+    net = load_net()
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8) for _ in range(max(args.sizes))]
+    detect_batch(net, images[:1])  # aquecimento
+
+    print(f"{'lote':>5}{'ms/lote':>10}{'ms/quadro':>11}{'quadros/s':>11}{'espera ms':>11}{'latência ms':>13}")
+    for size in args.sizes:
+        batch = images[:size]
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            detect_batch(net, batch)
+            timings.append((time.perf_counter() - start) * 1000)
+        forward_ms = statistics.median(timings)
+        # Em média um quadro espera metade do tempo de enchimento do lote
+        fill_ms = min((size - 1) / args.rate * 1000, args.max_wait_ms)
+        wait_ms = fill_ms / 2
+        print(f"{size:>5}{forward_ms:>10.1f}{forward_ms / size:>11.1f}{size / forward_ms * 1000:>11.1f}"
+              f"{wait_ms:>11.1f}{wait_ms + forward_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Microbenchmark de memória e vazão: read() + frombuffer contra o FrameRing (readinto).
+
+Um thread escreve quadros bgr24 sintéticos num pipe local; o leitor consome com cada
+estratégia e mede MB/s e o pico de memória alocada durante a leitura (tracemalloc).
+
+Uso:
+    python benchmarks/bench_frame_ring.py --size 1920x1080 --frames 300
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingest import FrameRing  # noqa: E402
+
+
+def start_writer(frame_bytes, frames):
+    """Abre um pipe local e escreve 'frames' quadros sintéticos nele em outro thread."""
+    read_fd, write_fd = os.pipe()
+    payload = np.random.randint(0, 255, frame_bytes, dtype=np.uint8).tobytes()
+
+    def writer():
+        with open(write_fd, 'wb', buffering=0) as out:
+            for _ in range(frames):
+                out.write(payload)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    return open(read_fd, 'rb', buffering=10**8), thread
+
+
+def read_legacy(width, height):
+    frame_bytes = width * height * 3
+
+    def run(stream):
+        count = 0
+        while True:
+            raw = stream.read(frame_bytes)
+            if len(raw) != frame_bytes:
+                return count
+            frame = np.frombuffer(raw, dtype='uint8').reshape((height, width, 3))
+            frame[0, 0, 0]  # toca no quadro como o loop de detecção faria
+            count += 1
+    return run
+
+
+def read_ring(width, height):
+    # Os buffers do anel são reservados aqui, fora da medição de regime
+    ring = FrameRing(width, height)
+
+    def run(stream):
+        count = 0
+        while True:
+            try:
+                frame = ring.read(stream)
+            except EOFError:
+                return count
+            if frame is None:
+                continue
+            frame.array[0, 0, 0]
+            frame.release()
+            count += 1
+    return run
+
+
+def measure(make_reader, width, height, frames):
+    """Retorna (quadros, MB/s, pico de memória alocada em regime em MB)."""
+    frame_bytes = width * height * 3
+    reader = make_reader(width, height)
+    stream, writer = start_writer(frame_bytes, frames)
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = reader(stream)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    writer.join()
+    stream.close()
+    return count, count * frame_bytes / elapsed / 1e6, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+    width, height = map(int, args.size.split('x'))
+
+    print(f"{'leitor':<10}{'quadros':>9}{'MB/s':>10}{'pico MB (regime)':>18}")
+    for name, reader in (("read()", read_legacy), ("FrameRing", read_ring)):
+        count, throughput, peak = measure(reader, width, height, args.frames)
+        print(f"{name:<10}{count:>9}{throughput:>10.0f}{peak:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compara o caminho antigo (todos os quadros nativos) com a amostragem no ffmpeg.
+
+Gera um clipe local de teste (testsrc) e mede, para cada caminho, bytes/s no pipe
+e CPU gasta por quadro efetivamente mantido para detecção.
+
+Uso:
+    python benchmarks/bench_sampling.py --duration 20 --size 1920x1080 --fps 25 \\
+        --sample-fps 0.1 --analysis 640x360 --keyframes
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingest import build_ffmpeg_command  # noqa: E402
+
+
+def make_clip(path, duration, size, fps, gop):
+    """Codifica um clipe de teste local para simular o stream comprimido da câmera."""
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi',
+        '-i', f'testsrc2=size={size}:rate={fps}:duration={duration}',
+        '-c:v', 'mpeg4', '-q:v', '5', '-g', str(gop), path
+    ], check=True)
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def self_cpu():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_path(command, frame_bytes):
+    """Lê o pipe até o fim e devolve (bytes lidos, quadros, CPU do ffmpeg + leitor, tempo)."""
+    cpu_before = children_cpu() + self_cpu()
+    start = time.perf_counter()
+    pipe = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10**8)
+    total = 0
+    frames = 0
+    while True:
+        raw = pipe.stdout.read(frame_bytes)
+        if len(raw) != frame_bytes:
+            total += len(raw)
+            break
+        total += len(raw)
+        frames += 1
+    pipe.wait()
+    elapsed = time.perf_counter() - start
+    return total, frames, children_cpu() + self_cpu() - cpu_before, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=20, help="duração do clipe em segundos")
+    parser.add_argument('--size', default='1920x1080')
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--gop', type=int, default=50, help="intervalo entre keyframes do clipe")
+    parser.add_argument('--capture-interval', type=float, default=10, help="intervalo do caminho antigo")
+    parser.add_argument('--sample-fps', type=float, default=0.1)
+    parser.add_argument('--analysis', default='640x360', help="resolução de análise LxA")
+    parser.add_argument('--keyframes', action='store_true', help="decodificar apenas keyframes")
+    args = parser.parse_args()
+
+    native_w, native_h = map(int, args.size.split('x'))
+    analysis_w, analysis_h = map(int, args.analysis.split('x'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, 'clip.mp4')
+        make_clip(clip, args.duration, args.size, args.fps, args.gop)
+
+        old_cmd = build_ffmpeg_command(clip, {})
+        new_cmd = build_ffmpeg_command(clip, {
+            "sample_fps": args.sample_fps,
+            "analysis_width": analysis_w,
+            "analysis_height": analysis_h,
+            "keyframes_only": args.keyframes,
+        })
+
+        old_bytes, _, old_cpu, _ = run_path(old_cmd, native_w * native_h * 3)
+        # O caminho antigo só mantém um quadro a cada capture_interval (tempo de mídia)
+        old_kept = max(1, int(args.duration // args.capture_interval))
+        new_bytes, new_kept, new_cpu, _ = run_path(new_cmd, analysis_w * analysis_h * 3)
+        new_kept = max(1, new_kept)
+
+    print(f"{'caminho':<12}{'MB/s pipe':>12}{'mantidos':>10}{'CPU s/quadro':>15}")
+    print(f"{'antigo':<12}{old_bytes / args.duration / 1e6:>12.2f}{old_kept:>10}{old_cpu / old_kept:>15.3f}")
+    print(f"{'amostragem':<12}{new_bytes / args.duration / 1e6:>12.2f}{new_kept:>10}{new_cpu / new_kept:>15.3f}")
+    print("(MB/s relativos ao tempo de mídia do clipe)")
+
+
+if __name__ == "__main__":
+    main()
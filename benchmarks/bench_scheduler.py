@@ -0,0 +1,95 @@
+"""Simula várias câmeras com episódios de atividade para medir o agendador adaptativo.
+
+Cada câmera entrega quadros a --fps; em momentos aleatórios começa um episódio de
+atividade (alguém passando) de alguns segundos. O filtro de movimento vê o episódio
+desde o primeiro quadro; a rede só "vê" a pessoa nos quadros analisados. Compara a
+taxa fixa (todo quadro entregue vai para a rede, como no motor antes do agendador)
+com o agendador, com e sem --budget-ms, em relógio simulado:
+    - quadros analisados (custo de rede) e uso médio do orçamento;
+    - atraso até o primeiro quadro analisado de cada episódio (tempo de resposta).
+
+Uso:
+    python benchmarks/bench_scheduler.py --cameras 8 --minutes 30 --budget-ms 300
+    python benchmarks/bench_scheduler.py --cameras 4 --idle-fps 0.2 --cost-ms 40
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import SamplingScheduler  # noqa: E402
+
+
+def episodes(rng, seconds, per_hour, length):
+    """Intervalos [início, fim) de atividade de uma câmera."""
+    count = rng.poisson(per_hour * seconds / 3600)
+    starts = np.sort(rng.uniform(0, seconds, count))
+    return [(start, start + rng.uniform(length / 2, length * 1.5)) for start in starts]
+
+
+def run(args, activity, config, gate):
+    scheduler = SamplingScheduler(config)
+    rates = [scheduler.add(f"cam{i}", config) for i in range(args.cameras)]
+    step = 1 / args.fps
+    analyzed = 0
+    delays = []
+    # Por câmera: índice do episódio atual e se ele já foi analisado
+    state = [[0, False] for _ in range(args.cameras)]
+    for tick in range(int(args.minutes * 60 * args.fps)):
+        for i, rate in enumerate(rates):
+            now = tick * step + i * step / args.cameras
+            current = state[i]
+            while current[0] < len(activity[i]) and activity[i][current[0]][1] <= now:
+                current[:] = [current[0] + 1, False]
+            active = current[0] < len(activity[i]) and activity[i][current[0]][0] <= now
+            if gate and active:
+                rate.note_activity(now)
+            if not scheduler.due(rate, now):
+                continue
+            scheduler.mark(rate, now)
+            scheduler.record(rate, args.cost_ms, now)
+            analyzed += 1
+            if active:
+                rate.note_activity(now)
+                if not current[1]:
+                    current[1] = True
+                    delays.append(now - activity[i][current[0]][0])
+    missed = sum(len(a) for a in activity) - len(delays)
+    return analyzed, delays, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cameras', type=int, default=8)
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--fps', type=float, default=5, help="quadros entregues pelo ffmpeg (sample_fps)")
+    parser.add_argument('--episodes-per-hour', type=float, default=6)
+    parser.add_argument('--episode-seconds', type=float, default=8)
+    parser.add_argument('--cost-ms', type=float, default=30, help="custo de rede por quadro")
+    parser.add_argument('--idle-fps', type=float, default=0.5)
+    parser.add_argument('--budget-ms', type=float, default=300)
+    parser.add_argument('--no-gate', action='store_true', help="sem filtro de movimento: só pessoas sobem a taxa")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    seconds = args.minutes * 60
+    activity = [episodes(rng, seconds, args.episodes_per_hour, args.episode_seconds) for _ in range(args.cameras)]
+    base = {"adaptive_sampling": True, "analysis_idle_fps": args.idle_fps, "analysis_active_fps": args.fps}
+    modes = [
+        ("taxa fixa", dict(base, adaptive_sampling=False)),
+        ("adaptativo", base),
+        (f"orçamento {args.budget_ms:g}", dict(base, inference_budget_ms=args.budget_ms)),
+    ]
+    print(f"{'modo':>16}{'analisados':>12}{'ms rede/s':>11}{'resposta p50/p90 s':>20}{'perdidos':>10}")
+    for name, config in modes:
+        analyzed, delays, missed = run(args, activity, config, gate=not args.no_gate)
+        load = analyzed * args.cost_ms / seconds
+        response = f"{np.percentile(delays, 50):.2f}/{np.percentile(delays, 90):.2f}" if delays else "-"
+        print(f"{name:>16}{analyzed:>12}{load:>11.0f}{response:>20}{missed:>10}")
+
+
+if __name__ == "__main__":
+    main()
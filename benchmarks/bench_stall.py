@@ -0,0 +1,96 @@
+"""Exercita o StreamSupervisor contra uma fonte local que pode travar.
+
+Um clipe MPEG-TS gerado com testsrc2 é escrito num FIFO, que o ffmpeg lê como se
+fosse a câmera. No instante --stall-at o escritor para de enviar dados por
+--stall-secs segundos (o ffmpeg fica sem quadros, como numa câmera travada); com
+--exit-at o escritor fecha o FIFO (o ffmpeg encerra, como numa queda de conexão).
+Ao final mostra reconexões, falhas por motivo, tempo fora e tempo até o primeiro quadro.
+
+Uso:
+    python benchmarks/bench_stall.py --duration 40 --stall-at 10 --stall-secs 8 --exit-at 25
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from supervisor import StreamSupervisor  # noqa: E402
+
+
+def make_clip(path, seconds=10):
+    subprocess.run([
+        'ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi',
+        '-i', f'testsrc2=size=1280x720:rate=25:duration={seconds}',
+        '-c:v', 'mpeg4', '-q:v', '5', '-g', '25', '-f', 'mpegts', path
+    ], check=True)
+
+
+def fifo_writer(fifo, clip, stop_event, start, stall_at, stall_secs, exit_at):
+    """Escreve o clipe em loop no FIFO, reabrindo a cada reconexão do ffmpeg."""
+    with open(clip, 'rb') as f:
+        payload = f.read()
+    chunk = 64 * 1024
+    stalled = exited = False
+    while not stop_event.is_set():
+        try:
+            with open(fifo, 'wb') as out:
+                while not stop_event.is_set():
+                    for offset in range(0, len(payload), chunk):
+                        elapsed = time.monotonic() - start
+                        if stall_at is not None and not stalled and elapsed >= stall_at:
+                            stalled = True
+                            print(f"[fonte] travando por {stall_secs} s")
+                            stop_event.wait(stall_secs)
+                        if exit_at is not None and not exited and elapsed >= exit_at:
+                            exited = True
+                            print("[fonte] encerrando a conexão")
+                            raise BrokenPipeError
+                        out.write(payload[offset:offset + chunk])
+        except BrokenPipeError:
+            continue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=40)
+    parser.add_argument('--stall-at', type=float, default=10)
+    parser.add_argument('--stall-secs', type=float, default=8)
+    parser.add_argument('--exit-at', type=float, default=25)
+    parser.add_argument('--stall-timeout', type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = os.path.join(tmp, 'clip.ts')
+        fifo = os.path.join(tmp, 'camera.fifo')
+        make_clip(clip)
+        os.mkfifo(fifo)
+
+        stop_event = threading.Event()
+        start = time.monotonic()
+        threading.Thread(target=fifo_writer, daemon=True,
+                         args=(fifo, clip, stop_event, start, args.stall_at, args.stall_secs, args.exit_at)).start()
+
+        config = {
+            "input_options": ["-re", "-f", "mpegts"],
+            "sample_fps": 5, "analysis_width": 640, "analysis_height": 360,
+            "stall_timeout": args.stall_timeout, "reconnect_backoff_initial": 0.5,
+        }
+        supervisor = StreamSupervisor(fifo, config, stop_event, log_ffmpeg=False)
+        frames = 0
+        while time.monotonic() - start < args.duration:
+            frame = supervisor.read()
+            if frame is not None:
+                frames += 1
+                frame.release()
+        stop_event.set()
+        supervisor.close()
+
+    print(f"quadros={frames} {supervisor.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
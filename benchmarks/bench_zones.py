@@ -0,0 +1,75 @@
+"""Compara inferência no quadro inteiro com inferência em blocos nas zonas.
+
+Para um quadro sintético na resolução informada e uma zona retangular (frações do
+quadro), mede o custo por quadro dos dois modos e mostra quantos pixels uma pessoa
+de --person-height pixels ocupa na entrada da rede em cada um (quanto maior, mais
+fácil de detectar de longe).
+
+Uso:
+    python benchmarks/bench_zones.py --size 2560x1440 --zone 0.6 0.1 0.95 0.5
+    python benchmarks/bench_zones.py --size 2560x1440 --zone 0 0.4 1 0.7 --max-tiles 12
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection import get_detector, model_files_exist  # noqa: E402
+from postprocess import PostProcessor  # noqa: E402
+from zones import ZoneLayout  # noqa: E402
+
+
+def timed(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default="2560x1440")
+    parser.add_argument('--zone', type=float, nargs=4, default=[0.6, 0.1, 0.95, 0.5], metavar=("X1", "Y1", "X2", "Y2"))
+    parser.add_argument('--max-tiles', type=int, default=8)
+    parser.add_argument('--person-height', type=int, default=120)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    if not model_files_exist():
+        raise SystemExit("Arquivos do modelo de IA não encontrados (MobileNetSSD_deploy.caffemodel).")
+    cv2.setNumThreads(args.threads)
+    width, height = (int(v) for v in args.size.split('x'))
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    x1, y1, x2, y2 = args.zone
+    config = {"zones": [[[x1, y1], [x2, y1], [x2, y2], [x1, y2]]], "zone_max_tiles": args.max_tiles}
+
+    detector = get_detector(config)
+    postprocess = PostProcessor(config)
+    zones = ZoneLayout(config)
+    tiles = zones.tiles(width, height)
+    side = tiles[0][2] - tiles[0][0]
+
+    def full_frame():
+        postprocess(detector.detect(frame), width, height)
+
+    def tiled():
+        zones.detect(detector, postprocess, frame)
+
+    full_ms = timed(full_frame, args.iterations)
+    tiled_ms = timed(tiled, args.iterations)
+    size = detector.input_size
+    print(f"{'modo':>14}{'blocos':>8}{'ms/quadro':>11}{'pessoa (px)':>13}")
+    print(f"{'quadro inteiro':>14}{1:>8}{full_ms:>11.1f}{args.person_height * size / height:>13.0f}")
+    print(f"{'zonas':>14}{len(tiles):>8}{tiled_ms:>11.1f}{args.person_height * size / side:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Mede cada perfil de ingestão: tempo até o primeiro quadro e atraso da câmera à análise.
+
+Modo sintético (padrão): um "emissor" gera quadros com o horário de envio gravado
+em blocos pretos e brancos, codifica com o ffmpeg e transmite em MPEG-TS por UDP
+local, no ritmo de --fps. Para cada perfil, um StreamSupervisor lê esse stream como
+se fosse a câmera; o horário lido de cada quadro dá o atraso do vidro à análise
+(codificação + transporte + buffer + decodificação + pipe). Opções só de RTSP não
+se aplicam a UDP; o resto do perfil (buffer, sondagem, decodificador) sim.
+
+Com --url (ou --camera, que usa a câmera do config.json), mede o tempo até o
+primeiro quadro e o intervalo entre quadros da câmera real; o atraso absoluto não
+é medido, porque a câmera não grava o horário de envio nos pixels.
+
+Uso:
+    python benchmarks/ingest_latency.py --duration 10
+    python benchmarks/ingest_latency.py --camera --profiles default low_latency robust_tcp
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ingest import INGEST_PROFILES, camera_url  # noqa: E402
+from supervisor import StreamSupervisor  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+# Horário em ms, 44 bits num grid de 11x4 blocos de 32 px no canto superior esquerdo
+BITS, COLUMNS, BLOCK = 44, 11, 32
+
+
+def encode_clock(frame, millis):
+    for bit in range(BITS):
+        row, col = divmod(bit, COLUMNS)
+        value = 255 if (millis >> bit) & 1 else 0
+        frame[row * BLOCK:(row + 1) * BLOCK, col * BLOCK:(col + 1) * BLOCK] = value
+
+
+def decode_clock(frame):
+    millis = 0
+    for bit in range(BITS):
+        row, col = divmod(bit, COLUMNS)
+        center = frame[row * BLOCK + BLOCK // 4:(row + 1) * BLOCK - BLOCK // 4,
+                       col * BLOCK + BLOCK // 4:(col + 1) * BLOCK - BLOCK // 4]
+        if center.mean() > 127:
+            millis |= 1 << bit
+    return millis
+
+
+def sender(url, width, height, fps, stop_event):
+    """Codifica quadros com o horário de envio e transmite em tempo real."""
+    encoder = subprocess.Popen([
+        'ffmpeg', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}',
+        '-r', f'{fps:g}', '-i', '-', '-c:v', 'mpeg4', '-q:v', '3', '-g', str(int(fps)),
+        '-flush_packets', '1', '-muxdelay', '0', '-f', 'mpegts', url
+    ], stdin=subprocess.PIPE)
+    frame = np.full((height, width, 3), 96, np.uint8)
+    interval = 1 / fps
+    next_time = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            encode_clock(frame, int(time.time() * 1000))
+            encoder.stdin.write(frame.tobytes())
+            encoder.stdin.flush()
+            next_time += interval
+            time.sleep(max(0, next_time - time.monotonic()))
+    except BrokenPipeError:
+        pass
+    finally:
+        encoder.stdin.close()
+        encoder.wait()
+
+
+def percentile_text(values):
+    if not values:
+        return "-"
+    p50, p90 = np.percentile(values, [50, 90])
+    return f"{p50:.0f}/{p90:.0f}"
+
+
+def measure(url, config, duration, synthetic):
+    stop_event = threading.Event()
+    supervisor = StreamSupervisor(url, config, stop_event, log_ffmpeg=False, name=config["ingest_profile"])
+    latencies, intervals = [], []
+    last = None
+    deadline = time.monotonic() + duration
+    # O limite vale também para uma câmera que não responde
+    timeout = threading.Timer(duration + 15, stop_event.set)
+    timeout.daemon = True
+    timeout.start()
+    while time.monotonic() < deadline and not stop_event.is_set():
+        frame = supervisor.read()
+        if frame is None:
+            continue
+        if synthetic:
+            latencies.append(frame.timestamp * 1000 - decode_clock(frame.array))
+        if last is not None:
+            intervals.append((frame.timestamp - last) * 1000)
+        last = frame.timestamp
+        frame.release()
+    timeout.cancel()
+    stop_event.set()
+    supervisor.close()
+    return supervisor.metrics(), latencies, intervals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=list(INGEST_PROFILES), choices=list(INGEST_PROFILES))
+    parser.add_argument('--duration', type=float, default=10, help="segundos por perfil")
+    parser.add_argument('--url', help="stream real a medir (sem atraso absoluto)")
+    parser.add_argument('--camera', action='store_true', help="usa a câmera do config.json")
+    parser.add_argument('--fps', type=float, default=25)
+    parser.add_argument('--size', default="640x360")
+    parser.add_argument('--port', type=int, default=23000)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    base = {"analysis_width": width, "analysis_height": height, "stall_timeout": 10}
+    synthetic = not (args.url or args.camera)
+    if args.camera:
+        with open(CONFIG_PATH, 'r', encoding="utf-8") as f:
+            camera = json.load(f)
+        url = camera_url(camera)
+        base = dict(camera, **base)
+    else:
+        url = args.url
+
+    print(f"{'perfil':>12}{'1º quadro s':>13}{'atraso p50/p90 ms':>19}{'intervalo p50/p90 ms':>22}{'quadros':>9}")
+    for index, profile in enumerate(args.profiles):
+        sender_stop = threading.Event()
+        source = url
+        if synthetic:
+            # Uma porta por perfil: nenhum pacote da medição anterior atrapalha
+            port = args.port + index
+            source = f"udp://127.0.0.1:{port}"
+            threading.Thread(target=sender, daemon=True,
+                             args=(f"udp://127.0.0.1:{port}?pkt_size=1316", width, height, args.fps, sender_stop)).start()
+        config = dict(base, ingest_profile=profile)
+        metrics, latencies, intervals = measure(source, config, args.duration, synthetic)
+        sender_stop.set()
+        ttff = metrics["time_to_first_frame_s"]
+        print(f"{profile:>12}{'-' if ttff is None else f'{ttff:.2f}':>13}{percentile_text(latencies):>19}"
+              f"{percentile_text(intervals):>22}{len(intervals) + (1 if ttff is not None else 0):>9}")
+
+
+if __name__ == "__main__":
+    main()
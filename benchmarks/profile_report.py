@@ -0,0 +1,44 @@
+"""Lê o resumo do perfil (profile.json) e aponta o estágio que limita a vazão.
+
+O resumo é gravado pelo monitor, pelo engine.py e pelo daemon.py quando o perfil
+está ligado ("profiling": true ou HOUSE_CAM_PROFILE=1; ver profiling.py). Mostra os
+estágios em ordem de tempo ocupado por segundo. Esperas (leitura do pipe, que inclui
+aguardar o ffmpeg, e filas) aparecem separadas: o gargalo é o estágio de trabalho
+mais ocupado, e quanto falta para ele ocupar um thread inteiro indica a folga.
+
+Uso:
+    python benchmarks/profile_report.py profile.json
+    python benchmarks/profile_report.py profile.json --top 8
+"""
+import argparse
+import json
+
+WAIT_PREFIXES = ("pipe_", "queue_wait:")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default="profile.json")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.path, 'r', encoding="utf-8") as f:
+        summary = json.load(f)
+    stages = sorted(summary["stages"].items(), key=lambda item: -(item[1]["busy"] or 0))
+    print(f"modo {summary['mode']}, {summary['elapsed_s']} s")
+    print(f"{'estágio':>26}{'por s':>9}{'média ms':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'máx':>9}{'ocupado':>9}")
+    for name, s in stages[:args.top]:
+        label = f"{name} (espera)" if name.startswith(WAIT_PREFIXES) else name
+        print(f"{label:>26}{s['per_s'] or 0:>9.2f}{s['mean_ms']:>10.2f}{s['p50_ms']:>9.2f}{s['p90_ms']:>9.2f}"
+              f"{s['p99_ms']:>9.2f}{s['max_ms']:>9.1f}{s['busy'] or 0:>9.0%}")
+
+    # Estágios "stage:<nome>" já somam os internos (forward, draw...): o gargalo sai dos internos
+    work = [(name, s) for name, s in stages if not name.startswith(WAIT_PREFIXES + ("stage:",))]
+    if work:
+        name, s = work[0]
+        print(f"\nEstágio mais ocupado: {name}, {s['busy']:.0%} de um thread "
+              f"({s['mean_ms']:.1f} ms x {s['per_s']:.1f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Replay offline: passa um vídeo local ou uma fonte sintética pelo pipeline real.
+
+A fonte vira uma "câmera" do MonitoringEngine com "reconnect": false, então os
+quadros percorrem o mesmo caminho do monitoramento (StreamSupervisor/FrameRing,
+filtro de movimento, lotes, processos de detecção, pós-processamento e alerta) e
+o replay termina quando o arquivo acaba. Sem --realtime a fonte é lida o mais
+rápido possível; com --realtime o ffmpeg segue o relógio do vídeo (-re). Por padrão
+todo quadro da fonte é entregue na resolução nativa (sem o sample_fps de 1 e os
+640x360 padrão do engine.py); --sample-fps e --analysis-size (ou --config) limitam.
+Como no monitoramento, quadros que chegam com a detecção ocupada são descartados
+(o mais recente vence); o relatório mostra quantos.
+
+Relatório: quadros entregues pelo ffmpeg por segundo (delivered_fps: depois do
+filtro de --sample-fps, se houver; sem ele, são os quadros decodificados), percentis da latência de inferência por lote,
+latência ponta a ponta por quadro (leitura do pipe até o alerta), memória máxima
+(este processo e os filhos) e detecções por quadro. Com --json o relatório também
+vai para um arquivo, para comparar execuções.
+
+Uso:
+    python benchmarks/replay.py --file gravacao.mp4 --realtime
+    python benchmarks/replay.py --lavfi "testsrc2=size=1280x720:rate=25" --duration 30 --streams 4
+    python benchmarks/replay.py --lavfi "testsrc2=size=1280x720:rate=25" --config camera.json --json relatorio.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection import model_files_exist  # noqa: E402
+from engine import MonitoringEngine  # noqa: E402
+
+
+def percentiles(values):
+    if not values:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": round(p50, 1), "p90": round(p90, 1), "p99": round(p99, 1), "max": round(max(values), 1)}
+
+
+def peak_memory_mb():
+    # ru_maxrss vem em KiB no Linux; para os filhos é o maior entre os que já terminaram
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def source_camera(args, index):
+    """Configuração de câmera que lê a fonte do replay."""
+    # Sem amostragem nem redução: o replay mede o pipeline com todo quadro da fonte
+    camera = {"name": f"replay{index + 1}", "reconnect": False,
+              "sample_fps": None, "analysis_width": None, "analysis_height": None}
+    if args.config:
+        with open(args.config, 'r', encoding="utf-8") as f:
+            camera.update(json.load(f))
+    input_options = ['-re'] if args.realtime else []
+    if args.lavfi:
+        source = args.lavfi + (f":duration={args.duration:g}" if args.duration else "")
+        camera.update(url=source, input_options=input_options + ['-f', 'lavfi'])
+    else:
+        camera.update(url=args.file, input_options=input_options)
+    if args.sample_fps is not None:
+        camera["sample_fps"] = args.sample_fps or None
+    if args.analysis_size:
+        camera["analysis_width"], camera["analysis_height"] = (int(v) for v in args.analysis_size.lower().split("x"))
+    return camera
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--file', help="vídeo local")
+    source.add_argument('--lavfi', help="fonte sintética do ffmpeg, ex.: testsrc2=size=1280x720:rate=25")
+    parser.add_argument('--duration', type=float, default=30, help="segundos da fonte lavfi")
+    parser.add_argument('--realtime', action='store_true', help="lê no ritmo do vídeo (-re)")
+    parser.add_argument('--streams', type=int, default=1, help="cópias simultâneas da fonte")
+    parser.add_argument('--sample-fps', type=float, help="quadros por segundo entregues (padrão: todos)")
+    parser.add_argument('--analysis-size', help="resolução de análise LxA, ex.: 640x360 (padrão: nativa)")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--config', help="JSON com chaves extras de câmera (modelo, movimento...)")
+    parser.add_argument('--json', help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    if not model_files_exist():
+        raise SystemExit("Arquivos do modelo de IA não encontrados (MobileNetSSD_deploy.caffemodel).")
+
+    lock = threading.Lock()
+    inference_ms = []
+    e2e_ms = []
+    detections = []
+    alerts = 0
+
+    def on_result(camera, frame, found):
+        nonlocal alerts
+        now = time.time()
+        with lock:
+            inference_ms.append(camera.last_inference_ms)
+            e2e_ms.append((now - frame.timestamp) * 1000)
+            detections.append(len(found))
+            alerts += camera.new_people
+
+    config = {
+        "cameras": [source_camera(args, i) for i in range(args.streams)],
+        "detection_workers": args.workers,
+        "batch_size": args.batch_size,
+        # Os alertas são contados no relatório; nenhum destino é acionado
+        "alert_sinks": [],
+        # Sem o agendador adaptativo: todo quadro entregue vai para a detecção (ou é
+        # descartado, e contado, se ela estiver ocupada)
+        "adaptive_sampling": False,
+    }
+    engine = MonitoringEngine(config, on_result=on_result)
+    start = time.monotonic()
+    engine.start()
+    try:
+        while not engine.drained():
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.monotonic() - start
+    stats = engine.stats()
+    engine.stop()
+
+    frames_read = sum(camera["frames_read"] for camera in stats.values())
+    report = {
+        "source": args.file or args.lavfi,
+        "realtime": args.realtime,
+        "streams": args.streams,
+        "elapsed_s": round(elapsed, 2),
+        "frames_read": frames_read,
+        "frames_analyzed": len(e2e_ms),
+        "frames_dropped": sum(camera["frames_dropped"] for camera in stats.values()),
+        # Quadros que saíram do ffmpeg (depois do filtro fps, com --sample-fps)
+        "delivered_fps": round(frames_read / elapsed, 1) if elapsed else None,
+        # Cada lote conta uma vez por quadro que continha
+        "inference_ms": percentiles(inference_ms),
+        "e2e_latency_ms": percentiles(e2e_ms),
+        "detections_per_frame": round(float(np.mean(detections)), 2) if detections else None,
+        "alerts": alerts,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Modo serviço: detecção sem interface gráfica, com MJPEG e métricas por HTTP.
+
+Roda o MonitoringEngine (todas as câmeras do config.json) e publica, num servidor
+HTTP local:
+    /                          página com os streams
+    /stream/<câmera>.mjpg      vídeo anotado (multipart/x-mixed-replace)
+    /snapshot/<câmera>.jpg     último quadro anotado
+    /metrics                   métricas no formato texto do Prometheus
+    /metrics.json              as mesmas métricas em JSON
+    /profile.json              tempo por estágio, com o perfil ligado (profiling.py)
+
+Cada quadro analisado é anotado e codificado em JPEG uma única vez; todos os
+clientes recebem os mesmos bytes, então cada espectador extra custa só o envio.
+
+Chaves do config.json: http_host (padrão "127.0.0.1"), http_port (padrão 8080),
+jpeg_quality (padrão 80).
+
+Uso:
+    python daemon.py
+"""
+import html
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+import cv2
+
+import profiling
+from detection import model_files_exist
+from engine import MonitoringEngine, load_cameras
+from postprocess import draw_detections
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+BOUNDARY = "quadro"
+
+
+class FrameHub:
+    """Último JPEG de cada câmera, com espera por quadro novo para os clientes MJPEG."""
+
+    def __init__(self, jpeg_quality=80):
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self.cond = threading.Condition()
+        self.frames = {}  # câmera -> (sequência, bytes do JPEG)
+        self.clients = 0
+        self.encoded = 0
+
+    def publish(self, camera, image):
+        """Codifica o quadro uma vez e acorda todos os clientes da câmera."""
+        with profiling.stage("jpeg_encode"):
+            ok, jpeg = cv2.imencode(".jpg", image, self.encode_params)
+        if not ok:
+            return
+        data = jpeg.tobytes()
+        with self.cond:
+            sequence = self.frames.get(camera, (0, None))[0] + 1
+            self.frames[camera] = (sequence, data)
+            self.encoded += 1
+            self.cond.notify_all()
+
+    def latest(self, camera):
+        with self.cond:
+            return self.frames.get(camera, (0, None))
+
+    def wait_next(self, camera, after, timeout=5):
+        """Espera um quadro com sequência maior que 'after'; devolve (sequência, bytes)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.frames.get(camera, (0, None))[0] > after, timeout)
+            return self.frames.get(camera, (0, None))
+
+
+def label_value(value):
+    """Valor de rótulo no formato texto do Prometheus (\\, aspas e quebras de linha escapados)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_metrics(engine, hub):
+    """Métricas no formato texto do Prometheus."""
+    lines = []
+    series = (
+        ("camera_frames_read_total", "counter", "frames_read"),
+        ("camera_frames_analyzed_total", "counter", "frames_analyzed"),
+        ("camera_frames_dropped_total", "counter", "frames_dropped"),
+        ("camera_errors_total", "counter", "errors"),
+        ("camera_reconnects_total", "counter", "reconnects"),
+        ("camera_downtime_seconds", "gauge", "downtime_s"),
+        ("camera_person_count", "gauge", "person_count"),
+        ("camera_analysis_fps", "gauge", "analysis_fps"),
+        ("camera_inference_ms", "gauge", "inference_ms"),
+        ("camera_pending_frames", "gauge", "pending"),
+        ("camera_target_fps", "gauge", "target_fps"),
+        ("camera_effective_fps", "gauge", "effective_fps"),
+        ("camera_frame_cost_ms", "gauge", "frame_cost_ms"),
+    )
+    stats = engine.stats()
+    for metric, kind, key in series:
+        lines.append(f"# TYPE {metric} {kind}")
+        for camera, values in stats.items():
+            lines.append(f'{metric}{{camera="{label_value(camera)}"}} {values[key] or 0}')
+    lines.append("# TYPE engine_in_flight_frames gauge")
+    lines.append(f"engine_in_flight_frames {engine.in_flight_total}")
+    pool = engine.pool_stats()
+    for metric, kind, key in (("detection_workers_alive", "gauge", "workers_alive"),
+                              ("detection_worker_restarts_total", "counter", "worker_restarts"),
+                              ("detection_batch_errors_total", "counter", "batch_errors")):
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.append(f"{metric} {pool[key]}")
+    sampling = engine.scheduler.metrics()
+    for metric, key in (("inference_budget_ms", "budget_ms"), ("inference_demand_ms", "demand_ms"),
+                        ("inference_used_ms", "used_ms"), ("inference_budget_scale", "scale")):
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {sampling[key] or 0}")
+    lines.append("# TYPE mjpeg_clients gauge")
+    lines.append(f"mjpeg_clients {hub.clients}")
+    lines.append("# TYPE jpeg_encoded_total counter")
+    lines.append(f"jpeg_encoded_total {hub.encoded}")
+    alerts = engine.alerts.metrics()
+    lines.append("# TYPE alerts_published_total counter")
+    lines.append(f"alerts_published_total {alerts.pop('published')}")
+    for metric, key in (("alerts_sent_total", "sent"), ("alerts_coalesced_total", "coalesced"),
+                        ("alerts_dropped_total", "dropped"), ("alerts_errors_total", "errors")):
+        lines.append(f"# TYPE {metric} counter")
+        for sink, values in alerts.items():
+            lines.append(f'{metric}{{sink="{label_value(sink)}"}} {values[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def make_handler(engine, hub):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = unquote(self.path.split("?", 1)[0])
+            if path == "/":
+                # O nome vira um segmento de URL (quote) e texto de HTML (escape); o servidor faz o unquote
+                items = "".join(f'<h3>{html.escape(name)}</h3><img src="/stream/{quote(name, safe="")}.mjpg">'
+                                for name in engine.stats())
+                self._send(200, "text/html; charset=utf-8", f"<html><body>{items}</body></html>".encode())
+            elif path == "/metrics":
+                self._send(200, "text/plain; version=0.0.4", prometheus_metrics(engine, hub).encode())
+            elif path == "/metrics.json":
+                body = {"cameras": engine.stats(), "in_flight": engine.in_flight_total, "pool": engine.pool_stats(),
+                        "mjpeg_clients": hub.clients, "jpeg_encoded": hub.encoded,
+                        "alerts": engine.alerts.metrics(), "sampling": engine.scheduler.metrics()}
+                self._send(200, "application/json", json.dumps(body).encode())
+            elif path == "/profile.json":
+                self._send(200, "application/json", json.dumps(profiling.current().summary()).encode())
+            elif path.startswith("/snapshot/") and path.endswith(".jpg"):
+                _, data = hub.latest(path[len("/snapshot/"):-len(".jpg")])
+                if data is None:
+                    self._send(404, "text/plain", b"Sem quadro ainda")
+                else:
+                    self._send(200, "image/jpeg", data)
+            elif path.startswith("/stream/") and path.endswith(".mjpg"):
+                self._stream(path[len("/stream/"):-len(".mjpg")])
+            else:
+                self._send(404, "text/plain", b"Nao encontrado")
+
+        def _stream(self, camera):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            with hub.cond:
+                hub.clients += 1
+            try:
+                sequence = 0
+                while not engine.stop_event.is_set():
+                    new_sequence, data = hub.wait_next(camera, sequence)
+                    if data is None or new_sequence == sequence:
+                        continue
+                    sequence = new_sequence
+                    self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(data)}\r\n\r\n".encode())
+                    self.wfile.write(data)
+                    self.wfile.write(b"\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                with hub.cond:
+                    hub.clients -= 1
+
+    return Handler
+
+
+def main():
+    with open(CONFIG_PATH, 'r', encoding="utf-8") as f:
+        config = json.load(f)
+    if not all(model_files_exist(camera) for camera in load_cameras(config)):
+        raise SystemExit("Arquivos do modelo de IA não encontrados. Baixe 'MobileNetSSD_deploy.prototxt' e 'MobileNetSSD_deploy.caffemodel'.")
+
+    hub = FrameHub(config.get("jpeg_quality", 80))
+
+    def on_result(camera, frame, found):
+        # O quadro ainda é nosso até o callback voltar: anota direto nele e codifica uma vez
+        with profiling.stage("draw"):
+            draw_detections(frame.array, found, camera.track_ids)
+        hub.publish(camera.camera_name, frame.array)
+
+    engine = MonitoringEngine(config, on_result=on_result)
+    try:
+        engine.start()
+    except RuntimeError as error:
+        raise SystemExit(str(error))
+
+    host, port = config.get("http_host", "127.0.0.1"), config.get("http_port", 8080)
+    server = ThreadingHTTPServer((host, port), make_handler(engine, hub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Monitorando {len(engine.cameras)} câmera(s); MJPEG e métricas em http://{host}:{port}/")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        engine.stop()
+        print("Monitoramento encerrado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Modelo de detecção: backends de inferência e montagem dos blobs de entrada.
+
+O padrão continua sendo a MobileNet-SSD em Caffe a 300x300. Pelo config.json dá
+para trocar o modelo e o custo de CPU de cada câmera:
+    model_format   "caffe" (padrão), "onnx" ou "openvino" (IR .xml/.bin, inclusive int8)
+    model_path     arquivo do modelo (.caffemodel, .onnx ou .xml)
+    model_config   arquivo auxiliar (.prototxt ou .bin)
+    input_size     lado da entrada da rede (padrão 300; 256 ou 224 custam menos CPU)
+    dnn_backend    "default", "opencv" ou "openvino" (padrão "openvino" para model_format "openvino")
+    dnn_target     "cpu" (padrão), "opencl" ou "opencl_fp16"
+    dnn_threads    threads do OpenCV na inferência (padrão: o do OpenCV)
+Todos os modelos devem ter a saída no formato DetectionOutput do SSD (1x1xNx7).
+
+get_detector() guarda a rede carregada e já aquecida por configuração, então
+parar e reiniciar o monitoramento não carrega o modelo de novo. Backend ou target
+inexistente, ou indisponível neste OpenCV (o opencv-python do pip não traz o
+OpenVINO), vira RuntimeError já no carregamento, com a configuração no texto.
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import profiling
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROTOTXT_PATH = os.path.join(BASE_DIR, 'MobileNetSSD_deploy.prototxt')
+MODEL_PATH = os.path.join(BASE_DIR, 'MobileNetSSD_deploy.caffemodel')
+
+INPUT_SIZE = 300
+INPUT_SCALE = 0.007843
+INPUT_MEAN = 127.5
+
+# Arquivos padrão de cada formato: (modelo, auxiliar)
+MODEL_FILES = {
+    "caffe": (MODEL_PATH, PROTOTXT_PATH),
+    "onnx": (os.path.join(BASE_DIR, 'MobileNetSSD.onnx'), None),
+    "openvino": (os.path.join(BASE_DIR, 'MobileNetSSD.xml'), os.path.join(BASE_DIR, 'MobileNetSSD.bin')),
+}
+
+DNN_BACKENDS = {
+    "default": cv2.dnn.DNN_BACKEND_DEFAULT,
+    "opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+    "openvino": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+}
+DNN_TARGETS = {
+    "cpu": cv2.dnn.DNN_TARGET_CPU,
+    "opencl": cv2.dnn.DNN_TARGET_OPENCL,
+    "opencl_fp16": cv2.dnn.DNN_TARGET_OPENCL_FP16,
+}
+
+
+def model_settings(config=None):
+    """Configuração do modelo com os padrões preenchidos (serve de chave de cache)."""
+    config = config or {}
+    model_format = config.get("model_format", "caffe")
+    if model_format not in MODEL_FILES:
+        raise ValueError(f"Formato de modelo desconhecido: {model_format}")
+    default_model, default_config = MODEL_FILES[model_format]
+    return {
+        "model_format": model_format,
+        "model_path": config.get("model_path") or default_model,
+        "model_config": config.get("model_config") or default_config,
+        "input_size": int(config.get("input_size", INPUT_SIZE)),
+        "dnn_backend": config.get("dnn_backend", "openvino" if model_format == "openvino" else "default"),
+        "dnn_target": config.get("dnn_target", "cpu"),
+    }
+
+
+def model_key(config=None):
+    return tuple(sorted(model_settings(config).items()))
+
+
+def model_files_exist(config=None):
+    settings = model_settings(config)
+    return all(path is None or os.path.exists(path) for path in (settings["model_path"], settings["model_config"]))
+
+
+def load_net(config=None):
+    """Lê a rede do formato configurado e aplica backend e target."""
+    settings = model_settings(config)
+    if settings["model_format"] == "caffe":
+        net = cv2.dnn.readNetFromCaffe(settings["model_config"], settings["model_path"])
+    elif settings["model_format"] == "onnx":
+        net = cv2.dnn.readNetFromONNX(settings["model_path"])
+    else:
+        net = cv2.dnn.readNet(settings["model_path"], settings["model_config"])
+    if settings["dnn_backend"] not in DNN_BACKENDS:
+        raise ValueError(f"dnn_backend desconhecido: {settings['dnn_backend']} (opções: {', '.join(DNN_BACKENDS)})")
+    if settings["dnn_target"] not in DNN_TARGETS:
+        raise ValueError(f"dnn_target desconhecido: {settings['dnn_target']} (opções: {', '.join(DNN_TARGETS)})")
+    net.setPreferableBackend(DNN_BACKENDS[settings["dnn_backend"]])
+    net.setPreferableTarget(DNN_TARGETS[settings["dnn_target"]])
+    return net
+
+
+def make_blob(frame, size=INPUT_SIZE):
+    """Converte um quadro BGR no blob size x size esperado pela rede."""
+    if frame.shape[:2] != (size, size):
+        with profiling.stage("resize"):
+            frame = cv2.resize(frame, (size, size))
+    with profiling.stage("blob"):
+        return cv2.dnn.blobFromImage(frame, INPUT_SCALE, (size, size), INPUT_MEAN)
+
+
+# --- INFERÊNCIA EM LOTE ---
+# Um único blobFromImages/forward para vários quadros. A saída do DetectionOutput
+# junta as detecções de todo o lote; a coluna 0 diz de qual imagem cada uma veio.
+
+def make_batch_blob(images, size=INPUT_SIZE):
+    """Blob Nx3xsize x size para uma lista de quadros BGR."""
+    with profiling.stage("resize"):
+        resized = [image if image.shape[:2] == (size, size) else cv2.resize(image, (size, size))
+                   for image in images]
+    with profiling.stage("blob"):
+        return cv2.dnn.blobFromImages(resized, INPUT_SCALE, (size, size), INPUT_MEAN)
+
+
+def split_detections(detections, count):
+    """Separa a saída de um lote em 'count' tensores 1x1xKx7, um por imagem."""
+    rows = detections[0, 0]
+    image_ids = rows[:, 0].astype(np.int32)
+    return [rows[image_ids == i][np.newaxis, np.newaxis] for i in range(count)]
+
+
+def detect_batch(net, images, size=INPUT_SIZE):
+    """Roda a rede uma vez para todo o lote e devolve as detecções de cada imagem."""
+    net.setInput(make_batch_blob(images, size))
+    with profiling.stage("forward"):
+        detections = net.forward()
+    return split_detections(detections, len(images))
+
+
+# --- BACKEND COM AQUECIMENTO E CACHE ---
+
+class Detector:
+    """Rede carregada com backend/target/tamanho de entrada do config, já aquecida."""
+
+    def __init__(self, config=None):
+        self.settings = model_settings(config)
+        self.input_size = self.settings["input_size"]
+        start = time.perf_counter()
+        self.net = load_net(config)
+        self.load_ms = (time.perf_counter() - start) * 1000
+        # O primeiro forward aloca buffers e escolhe kernels; melhor pagar isso aqui
+        start = time.perf_counter()
+        self.detect(np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8))
+        self.warmup_ms = (time.perf_counter() - start) * 1000
+
+    def detect(self, image):
+        """Detecções (1x1xNx7) de um quadro BGR."""
+        self.net.setInput(make_blob(image, self.input_size))
+        with profiling.stage("forward"):
+            return self.net.forward()
+
+    def detect_batch(self, images):
+        return detect_batch(self.net, images, self.input_size)
+
+
+_DETECTORS = {}
+_DETECTORS_LOCK = threading.Lock()
+
+
+def get_detector(config=None):
+    """Detector em cache para a configuração de modelo; carrega e aquece na primeira vez."""
+    threads = (config or {}).get("dnn_threads")
+    if threads:
+        cv2.setNumThreads(int(threads))
+    key = model_key(config)
+    with _DETECTORS_LOCK:
+        detector = _DETECTORS.get(key)
+        if detector is None:
+            settings = model_settings(config)
+            try:
+                # O backend só é criado no primeiro forward, dentro do aquecimento
+                detector = Detector(config)
+            except (cv2.error, ValueError) as error:
+                raise RuntimeError(f"Não foi possível carregar o modelo {settings['model_path']} com dnn_backend "
+                                   f"'{settings['dnn_backend']}' e dnn_target '{settings['dnn_target']}': {error}") from error
+            _DETECTORS[key] = detector
+            print(f"Modelo {detector.settings['model_format']} {detector.input_size}x{detector.input_size} "
+                  f"carregado em {detector.load_ms:.0f} ms (aquecimento {detector.warmup_ms:.0f} ms).")
+    return detector
@@ -0,0 +1,568 @@
+"""Motor de monitoramento de várias câmeras com um pool compartilhado de detecção.
+
+Cada câmera tem um thread leve de ingestão (ffmpeg + FrameRing) que só guarda os
+quadros mais recentes. Um despachante junta esses quadros, em rodízio entre as
+câmeras, em lotes de até 'batch_size' (ou o que chegar em 'batch_max_wait_ms') e os
+envia para um pool limitado de processos de detecção. Cada processo carrega a
+MobileNet-SSD uma única vez, roda um forward por lote e atende todas as câmeras.
+
+Uso sem interface gráfica:
+    python engine.py
+"""
+import collections
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+
+import cv2
+
+import profiling
+from alerts import AlertBus
+from detection import get_detector, model_files_exist, model_key, model_settings
+from ingest import camera_url
+from motion import MotionGate, crop
+from postprocess import PostProcessor, PERSON_CLASS_ID
+from recorder import ClipRecorder
+from scheduler import ACTIVE_FPS, SamplingScheduler
+from tracker import Tracker, tracks_to_detections
+from zones import ZoneLayout
+from supervisor import StreamSupervisor
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+# Com várias câmeras o ffmpeg sempre amostra e reduz; a resolução de análise
+# também dispensa esperar o stderr para saber o tamanho do quadro. Câmeras com
+# zonas ficam na resolução nativa: os blocos é que reduzem o custo.
+CAMERA_DEFAULTS = {"sample_fps": 1, "analysis_width": 640, "analysis_height": 360}
+
+
+def load_cameras(config):
+    """Lista de câmeras do config.
+
+    Aceita o formato antigo (uma câmera no topo do config.json) ou uma lista em
+    'cameras'. Chaves no topo valem como padrão para todas as câmeras da lista.
+    """
+    shared = {key: value for key, value in config.items() if key != "cameras"}
+    entries = config.get("cameras") or [{}]
+    cameras = []
+    for i, entry in enumerate(entries):
+        camera = dict(CAMERA_DEFAULTS)
+        camera.update(shared)
+        camera.update(entry)
+        if camera.get("zones"):
+            # Blocos de 300 px sobre um quadro já reduzido para 640x360 não ganham resolução
+            for key in ("analysis_width", "analysis_height"):
+                if key not in shared and key not in entry:
+                    camera.pop(key)
+        if camera.get("adaptive_sampling", False) and "sample_fps" not in shared and "sample_fps" not in entry:
+            # O ffmpeg entrega na taxa ativa; o agendador decide quantos quadros vão para a rede.
+            # A decodificação fica sempre nessa taxa, mesmo com a cena parada
+            camera["sample_fps"] = camera.get("analysis_active_fps", ACTIVE_FPS)
+        camera.setdefault("name", camera.get("ip") or f"camera{i + 1}")
+        cameras.append(camera)
+    return cameras
+
+
+def detection_worker(tasks, results, models, threads=1):
+    """Processo de detecção: carrega e aquece cada modelo uma vez e atende lotes de qualquer câmera.
+
+    Cada resultado é (chaves, detecções, ms, erro); um lote que falha volta com
+    detecções None e a mensagem em 'erro', e o processo segue atendendo.
+    """
+    # O paralelismo vem dos processos; threads internas do OpenCV só competiriam entre si
+    cv2.setNumThreads(threads)
+    for settings in models:
+        try:
+            get_detector(settings)
+        except Exception as error:  # o erro volta em cada lote deste modelo
+            print(f"Falha ao carregar o modelo {settings['model_path']}: {error}")
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        settings, keys, images = task
+        start = time.perf_counter()
+        try:
+            batch_detections = get_detector(settings).detect_batch(images)
+        except Exception as error:
+            results.put((keys, None, 0.0, f"{type(error).__name__}: {error}"))
+            continue
+        results.put((keys, batch_detections, (time.perf_counter() - start) * 1000, None))
+
+
+class CameraWorker(threading.Thread):
+    """Ingestão de uma câmera: mantém apenas o quadro mais recente para o despachante."""
+
+    def __init__(self, index, camera, engine):
+        super().__init__(daemon=True, name=f"ingest-{camera['name']}")
+        self.index = index
+        self.camera = camera
+        self.camera_name = camera["name"]
+        self.engine = engine
+        # Um slot lendo, até um lote pendente, até um lote em detecção e um de folga para o callback
+        self.supervisor = StreamSupervisor(camera_url(camera), camera, engine.stop_event,
+                                           ring_slots=2 * engine.batch_size + 2, name=camera["name"],
+                                           log_ffmpeg=False, on_connect=self._on_connect)
+        self.gate = MotionGate(camera) if camera.get("motion_gate") else None
+        self.postprocess = PostProcessor(camera)
+        # Modelo e tamanho de entrada desta câmera; lotes só juntam câmeras com o mesmo modelo
+        self.model = model_settings(camera)
+        self.model_key = model_key(camera)
+        # Zonas poligonais: cada quadro vira blocos na resolução da rede, só nas zonas ativas
+        self.zones = ZoneLayout(camera)
+        # Trilhas entre quadros: contagem estável, alerta só na entrada e rede a cada 'detect_every' quadros
+        self.tracker = Tracker(camera) if camera.get("tracking", True) else None
+        self.track_ids = None
+        # Clipes de evento copiados do stream comprimido, sem recodificar
+        self.recorder = ClipRecorder(camera_url(camera), camera, camera["name"]) if camera.get("record_clips") else None
+        # Taxa de análise: sobe com movimento ou pessoa, decai na cena parada
+        self.rate = engine.scheduler.add(camera["name"], camera)
+        # Protegidos por engine.cond; entradas são (quadro, regiões), com None = quadro inteiro
+        self.pending = collections.deque()
+        self.in_flight = {}
+        # Estatísticas
+        self.frames_read = 0
+        self.frames_analyzed = 0
+        self.frames_dropped = 0
+        # Quadros perdidos por erro (redimensionamento, detecção ou pós-processamento)
+        self.errors = 0
+        self.person_count = 0
+        self.new_people = 0
+        self.inference_ms = 0.0
+        self.last_inference_ms = 0.0
+        self.analyzed_times = collections.deque()
+
+    def _on_connect(self):
+        if self.gate is not None:
+            self.gate.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    @profiling.profiled
+    def run(self):
+        stop_event = self.engine.stop_event
+        while not stop_event.is_set():
+            try:
+                frame = self.supervisor.read()
+            except FileNotFoundError:
+                print(f"[{self.camera_name}] ffmpeg não encontrado!")
+                return
+            if frame is None:
+                if self.supervisor.finished:
+                    break
+                if not stop_event.is_set():
+                    self.frames_dropped += 1
+                continue
+            self.frames_read += 1
+            roi = None
+            if self.gate is not None:
+                with profiling.stage("motion"):
+                    moving, roi = self.gate.check(frame.array)
+                if not moving:
+                    frame.release()
+                    continue
+                self.rate.note_activity()
+            regions = self._regions(frame.array, roi)
+            if regions is None:
+                frame.release()
+                continue
+            self.engine.submit(self, frame, regions)
+
+    def _regions(self, image, roi, now=None):
+        """Regiões do quadro para a rede, ou None se ele não vai para a rede agora."""
+        scheduler = self.engine.scheduler
+        if not scheduler.due(self.rate, now):
+            return None
+        regions = [roi]
+        if self.zones.enabled:
+            (h, w) = image.shape[:2]
+            regions = self.zones.tiles(w, h, roi)
+            if not regions:
+                # Movimento só fora das zonas
+                return None
+        # O quadro coberto pelas trilhas também ocupa a vez no agendador: detect_every
+        # divide a taxa de análise, e não a de quadros entregues pelo ffmpeg
+        scheduler.mark(self.rate, now)
+        if self.tracker is not None and not self.tracker.needs_detection():
+            # Sem quadros na tela, as trilhas só precisam ser atualizadas na próxima rodada da rede
+            return None
+        return regions
+
+
+class MonitoringEngine:
+    """Agenda quadros de N câmeras num pool limitado de processos de detecção.
+
+    on_result(camera, frame, found) é chamado para cada quadro analisado, com as
+    detecções (postprocess.Detections) já em coordenadas do quadro. Com rastreamento,
+    'found' traz as trilhas confirmadas (IDs em camera.track_ids) e camera.new_people
+    quantas pessoas acabaram de entrar; essas vão também para o barramento de alertas
+    (alerts.AlertBus). O quadro é devolvido ao anel logo depois, então copie-o se
+    precisar guardá-lo.
+    """
+
+    def __init__(self, config, workers=None, on_result=None):
+        self.cameras_config = load_cameras(config)
+        self.workers = workers or config.get("detection_workers") or max(1, (os.cpu_count() or 2) - 1)
+        self.dnn_threads = int(config.get("dnn_threads", 1))
+        self.batch_size = max(1, int(config.get("batch_size", 1)))
+        self.batch_max_wait = config.get("batch_max_wait_ms", 20) / 1000
+        # Até dois lotes por processo: um em execução e um já na fila
+        self.max_in_flight = 2 * self.workers * self.batch_size
+        self._sequence = itertools.count()
+        self.on_result = on_result
+        self.config = config
+        self.alerts = None
+        self.scheduler = None
+        self.stop_event = threading.Event()
+        self.cond = threading.Condition()
+        self.in_flight_total = 0
+        self.cameras = []
+        self.processes = []
+        self.threads = []
+        self.tasks = None
+        self.results = None
+        self.models = []
+        # Lotes que voltaram com erro e processos de detecção que morreram (e foram reiniciados)
+        self.batch_errors = 0
+        self.worker_restarts = 0
+
+    def _spawn_worker(self):
+        process = mp.Process(target=detection_worker, daemon=True,
+                             args=(self.tasks, self.results, self.models, self.dnn_threads))
+        process.start()
+        return process
+
+    def start(self):
+        """Sobe o pool e as câmeras; RuntimeError se algum modelo não carrega (backend, target, arquivo)."""
+        self.models = list({model_key(camera): model_settings(camera) for camera in self.cameras_config}.values())
+        # Carrega e aquece cada modelo aqui, antes do fork: um backend indisponível aparece
+        # uma vez, neste processo, e os processos de detecção herdam a rede pronta
+        for settings in self.models:
+            get_detector(settings)
+        self.stop_event.clear()
+        self.tasks = mp.Queue()
+        self.results = mp.Queue()
+        # Os processos sobem antes dos threads para não herdar threads num fork
+        self.processes = [self._spawn_worker() for _ in range(self.workers)]
+
+        # Threads não reiniciam: um barramento novo a cada start()
+        self.alerts = AlertBus(self.config)
+        self.alerts.start()
+        self.scheduler = SamplingScheduler(self.config)
+        self.cameras = [CameraWorker(i, camera, self) for i, camera in enumerate(self.cameras_config)]
+        self.threads = [threading.Thread(target=self._dispatch_loop, daemon=True, name="despachante"),
+                        threading.Thread(target=self._result_loop, daemon=True, name="resultados")]
+        # Depois dos processos: eles não herdam o perfil (nem seus threads)
+        profiling.configure(self.config)
+        for thread in self.threads + self.cameras:
+            thread.start()
+        for camera in self.cameras:
+            if camera.recorder is not None:
+                camera.recorder.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        for camera in self.cameras:
+            camera.supervisor.close()
+        dispatcher, collector = self.threads
+        # Nenhum lote pode entrar na fila depois do sinal de parada dos processos
+        dispatcher.join(timeout=5)
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.results.put(None)
+        collector.join(timeout=5)
+        for camera in self.cameras:
+            if camera.recorder is not None:
+                camera.recorder.stop()
+        self.alerts.stop()
+        # O perfil só é fechado com os threads de ingestão fora do cProfile
+        for camera in self.cameras:
+            camera.join(timeout=2)
+        profiling.close()
+
+    def drained(self):
+        """True quando todas as câmeras terminaram (replay) e não há quadro pendente nem em detecção."""
+        with self.cond:
+            return (not any(camera.is_alive() for camera in self.cameras)
+                    and self.in_flight_total == 0 and not any(camera.pending for camera in self.cameras))
+
+    def submit(self, camera, frame, regions=(None,)):
+        """Enfileira o quadro da câmera; com a fila cheia, o mais antigo é descartado.
+
+        'regions' são os recortes a analisar (ROI de movimento ou blocos das zonas).
+        """
+        with self.cond:
+            if len(camera.pending) >= self.batch_size:
+                camera.frames_dropped += 1
+                camera.pending.popleft()[0].release()
+            camera.pending.append((frame, regions))
+            self.cond.notify()
+
+    def _next_camera(self, start, key=None):
+        """Primeira câmera, em rodízio a partir de 'start', com quadro pendente e espaço para detecção.
+
+        Com 'key', só câmeras que usam esse modelo entram (o lote já começou com ele).
+        """
+        count = len(self.cameras)
+        for offset in range(count):
+            camera = self.cameras[(start + offset) % count]
+            if key is not None and camera.model_key != key:
+                continue
+            if camera.pending and len(camera.in_flight) < self.batch_size:
+                return camera
+        return None
+
+    def _collect_batch(self, next_index):
+        """Junta até batch_size quadros em rodízio; espera no máximo batch_max_wait pelo lote cheio."""
+        batch = []
+        deadline = None
+        key = None
+        with self.cond:
+            while not self.stop_event.is_set() and len(batch) < self.batch_size:
+                camera = None
+                if self.in_flight_total < self.max_in_flight:
+                    camera = self._next_camera(next_index, key)
+                if camera is None:
+                    if not batch:
+                        self.cond.wait(0.1)
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                    continue
+                entry = camera.pending.popleft()
+                key = camera.model_key
+                sequence = next(self._sequence)
+                camera.in_flight[sequence] = entry
+                self.in_flight_total += 1
+                batch.append((camera, sequence, entry))
+                next_index = camera.index + 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_max_wait
+        return batch, next_index
+
+    @profiling.profiled
+    def _dispatch_loop(self):
+        next_index = 0
+        while not self.stop_event.is_set():
+            batch, next_index = self._collect_batch(next_index)
+            if not batch:
+                continue
+            # Redimensiona aqui para enviar só a entrada da rede (ex.: 300x300) aos processos;
+            # cada região vira uma imagem do lote, todas com a chave do seu quadro
+            model = batch[0][0].model
+            size = (model["input_size"], model["input_size"])
+            # Espera de cada quadro entre a leitura do pipe e o lote (timestamp é time.time())
+            now, wall = time.perf_counter(), time.time()
+            for _, _, (frame, _) in batch:
+                profiling.record("queue_wait:lote", now - (wall - frame.timestamp), now)
+            keys = []
+            images = []
+            with profiling.stage("resize"):
+                for camera, sequence, (frame, regions) in batch:
+                    try:
+                        resized = [cv2.resize(crop(frame.array, region), size) for region in regions]
+                    except Exception:  # um quadro ruim não derruba o despachante nem o lote
+                        self._drop_in_flight(camera, sequence, traceback.format_exc())
+                        continue
+                    keys += [(camera.index, sequence)] * len(resized)
+                    images += resized
+            if images:
+                self.tasks.put((model, keys, images))
+
+    def _drop_in_flight(self, camera, sequence, error):
+        """Tira o quadro da detecção por erro e devolve o slot ao anel."""
+        with self.cond:
+            entry = camera.in_flight.pop(sequence, None)
+            if entry is not None:
+                self.in_flight_total -= 1
+            self.cond.notify()
+        if entry is not None:
+            entry[0].release()
+        camera.errors += 1
+        print(f"[{camera.camera_name}] Quadro descartado por erro:\n{error}", end="")
+
+    def _check_workers(self):
+        """Reinicia o pool se um processo de detecção morreu; os quadros em detecção são descartados."""
+        dead = [process for process in self.processes if process.exitcode is not None]
+        if not dead or self.stop_event.is_set():
+            return
+        for process in dead:
+            print(f"Processo de detecção terminou (código {process.exitcode}); reiniciando o pool.")
+        self.worker_restarts += len(dead)
+        # Um processo morto no meio de get()/put() deixa o lock da fila preso: filas e
+        # processos novos, e as filas antigas não seguram o encerramento do interpretador
+        for process in self.processes:
+            if process.exitcode is None:
+                process.terminate()
+        for old in (self.tasks, self.results):
+            old.cancel_join_thread()
+        self.tasks = mp.Queue()
+        self.results = mp.Queue()
+        self.processes = [self._spawn_worker() for _ in range(self.workers)]
+        # Não há como saber que lote o processo atendia: sem isso, as câmeras dele
+        # ficariam com quadros em detecção para sempre e parariam de ser despachadas.
+        # Resultados que ainda chegarem desses quadros são ignorados.
+        with self.cond:
+            lost = [(camera, frame) for camera in self.cameras for frame, _ in camera.in_flight.values()]
+            for camera in self.cameras:
+                camera.in_flight.clear()
+            self.in_flight_total = 0
+            self.cond.notify_all()
+        for camera, frame in lost:
+            camera.errors += 1
+            frame.release()
+
+    @profiling.profiled
+    def _result_loop(self):
+        while True:
+            try:
+                item = self.results.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if item is None:
+                break
+            keys, batch_detections, inference_ms, error = item
+            if error is not None:
+                self.batch_errors += 1
+                print(f"Erro no processo de detecção: {error}")
+                batch_detections = [None] * len(keys)
+            else:
+                # O lote rodou noutro processo: entra no trace terminando agora, num trilho próprio
+                received = time.perf_counter()
+                profiling.record("batch_forward", received - inference_ms / 1000, received,
+                                 thread="processos de detecção")
+            for (camera_index, sequence), group in itertools.groupby(zip(keys, batch_detections), key=lambda k: k[0]):
+                camera = self.cameras[camera_index]
+                with self.cond:
+                    entry = camera.in_flight.pop(sequence, None)
+                    if entry is not None:
+                        self.in_flight_total -= 1
+                    self.cond.notify()
+                if entry is None:
+                    # Descartado quando um processo de detecção morreu
+                    continue
+                frame, regions = entry
+                if error is not None:
+                    camera.errors += 1
+                    frame.release()
+                    continue
+                # Como nos estágios do pipeline: um erro perde o quadro, não o thread
+                try:
+                    self._handle_result(camera, frame, regions, [d for _, d in group], inference_ms, len(keys))
+                except Exception:
+                    camera.errors += 1
+                    print(f"[{camera.camera_name}] Erro ao processar o resultado:\n{traceback.format_exc()}", end="")
+                finally:
+                    frame.release()
+
+    def _handle_result(self, camera, frame, regions, detections, inference_ms, batch_images):
+        """Pós-processamento, trilhas, alertas e on_result de um quadro; quem chama devolve o quadro."""
+        with profiling.stage("postprocess"):
+            parts = []
+            for region, region_detections in zip(regions, detections):
+                (h, w) = crop(frame.array, region).shape[:2]
+                parts.append(camera.postprocess(region_detections, w, h, origin=region[:2] if region else (0, 0)))
+            if camera.zones.enabled:
+                (h, w) = frame.array.shape[:2]
+                found = camera.zones.accept(camera.zones.merge(parts), w, h)
+            else:
+                found = parts[0]
+        if camera.tracker is not None:
+            with profiling.stage("tracker"):
+                tracks, entered = camera.tracker.update(found)
+            found = tracks_to_detections(tracks)
+            camera.track_ids = [track.track_id for track in tracks]
+            camera.new_people = sum(1 for track in entered if track.class_id == PERSON_CLASS_ID)
+            camera.person_count = found.count(PERSON_CLASS_ID)
+        else:
+            camera.person_count = camera.new_people = found.count(PERSON_CLASS_ID)
+        # Custo da rede deste quadro: a parte do lote que coube às suas regiões
+        self.scheduler.record(camera.rate, inference_ms * len(regions) / batch_images)
+        if camera.person_count:
+            camera.rate.note_activity()
+        if camera.new_people:
+            self.alerts.publish(camera.camera_name, camera.new_people, frame.timestamp)
+        if camera.person_count and camera.recorder is not None:
+            camera.recorder.trigger(frame.timestamp)
+        camera.frames_analyzed += 1
+        camera.last_inference_ms = inference_ms
+        camera.inference_ms = 0.9 * camera.inference_ms + 0.1 * inference_ms if camera.inference_ms else inference_ms
+        now = time.monotonic()
+        camera.analyzed_times.append(now)
+        while now - camera.analyzed_times[0] > 5:
+            camera.analyzed_times.popleft()
+        if self.on_result is not None:
+            with profiling.stage("on_result"):
+                self.on_result(camera, frame, found)
+
+    def stats(self):
+        return {
+            camera.camera_name: {
+                "frames_read": camera.frames_read,
+                "frames_analyzed": camera.frames_analyzed,
+                "frames_dropped": camera.frames_dropped,
+                "errors": camera.errors,
+                "person_count": camera.person_count,
+                "analysis_fps": round(len(camera.analyzed_times) / 5, 2),
+                "inference_ms": round(camera.inference_ms, 1),
+                "pending": len(camera.pending),
+                **camera.supervisor.metrics(),
+                "motion_hit_rate": round(camera.gate.hit_rate, 3) if camera.gate else None,
+                "clips_saved": camera.recorder.clips_saved if camera.recorder else None,
+                "people_entered": camera.tracker.total_confirmed if camera.tracker else None,
+                **self.scheduler.camera_metrics(camera.rate),
+            }
+            for camera in self.cameras
+        }
+
+    def pool_stats(self):
+        """Estado do pool de detecção: processos vivos, reinícios e lotes com erro."""
+        return {
+            "workers": len(self.processes),
+            "workers_alive": sum(1 for process in self.processes if process.is_alive()),
+            "worker_restarts": self.worker_restarts,
+            "batch_errors": self.batch_errors,
+        }
+
+
+# --- EXECUÇÃO SEM INTERFACE GRÁFICA ---
+if __name__ == "__main__":
+    with open(CONFIG_PATH, 'r', encoding="utf-8") as f:
+        configuracao = json.load(f)
+    if not all(model_files_exist(camera) for camera in load_cameras(configuracao)):
+        raise SystemExit("Arquivos do modelo de IA não encontrados. Baixe 'MobileNetSSD_deploy.prototxt' e 'MobileNetSSD_deploy.caffemodel'.")
+
+    engine = MonitoringEngine(configuracao)
+    try:
+        engine.start()
+    except RuntimeError as error:
+        raise SystemExit(str(error))
+    print(f"Monitorando {len(engine.cameras)} câmera(s) com {engine.workers} processo(s) de detecção.")
+    try:
+        while True:
+            time.sleep(10)
+            for name, stats in engine.stats().items():
+                print(f"[{name}] {stats}")
+            pool = engine.pool_stats()
+            print(f"[detecção] {pool['workers_alive']}/{pool['workers']} processo(s) vivo(s), "
+                  f"{pool['worker_restarts']} reinício(s), {pool['batch_errors']} lote(s) com erro")
+            sampling = engine.scheduler.metrics()
+            print(f"[agendador] inferência {sampling['used_ms']} ms/s (orçamento: {sampling['budget_ms'] or 'sem limite'}), "
+                  f"demanda {sampling['demand_ms']} ms/s, escala {sampling['scale']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        print("Monitoramento encerrado.")
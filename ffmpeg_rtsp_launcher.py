@@ -5,6 +5,8 @@ import os
 import subprocess
 import shutil
 
+from ingest import camera_url, input_options
+
 # --- Caminho absoluto para o config.json, garantindo que funcione de qualquer lugar ---
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
 
@@ -132,16 +134,17 @@ class App:
             messagebox.showerror("Erro", "Comando 'ffplay' não encontrado. Verifique se o FFmpeg está instalado e no PATH do sistema.")
             return
 
-        url = f'rtsp://{self.config["usuario"]}:{self.config["senha"]}@{self.config["ip"]}:{self.config["porta"]}/{self.config["stream_path"]}'
-        cmd = f'ffplay -noborder -autoexit "{url}"'
+        url = camera_url(self.config)
+        # Mesmo perfil de ingestão do monitor ("ingest_profile" no config.json); lista de
+        # argumentos em vez de shell=True, então a senha na URL não passa pelo shell
+        cmd = ['ffplay', '-noborder', '-autoexit'] + input_options(url, self.config) + [url]
 
         self.btn_start.config(state="disabled", text="Câmera em execução...")
 
         try:
             # Redireciona a saída do subprocesso para DEVNULL para evitar que o buffer encha e congele a GUI.
             self.ffplay_process = subprocess.Popen(
-                cmd, 
-                shell=True,
+                cmd,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
@@ -0,0 +1,221 @@
+"""Montagem do comando ffmpeg e leitura dos quadros brutos da câmera."""
+import collections
+import time
+
+import numpy as np
+
+import profiling
+
+# --- AMOSTRAGEM NO DECODIFICADOR ---
+# Quando 'sample_fps' ou a resolução de análise estão no config.json, o próprio
+# ffmpeg limita a taxa (filtro fps) e reduz a imagem (filtro scale). Assim o pipe
+# só transporta os quadros que realmente serão analisados.
+
+
+def camera_url(config):
+    """Monta a URL RTSP a partir da configuração da câmera.
+
+    Uma chave 'url' explícita (arquivo local, outro protocolo) tem precedência.
+    """
+    if config.get("url"):
+        return config["url"]
+    return f'rtsp://{config["usuario"]}:{config["senha"]}@{config["ip"]}:{config["porta"]}/{config["stream_path"]}'
+
+
+# --- PERFIS DE INGESTÃO ---
+# Opções de entrada do ffmpeg/ffplay/ffprobe por perfil, escolhido por câmera com
+# "ingest_profile". Só valem para qualquer decodificador por software (nada de
+# aceleração específica de hardware). Cada perfil separa:
+#   rtsp     opções do demuxer RTSP (só entram em URLs rtsp://)
+#   demux    buffer e sondagem da entrada
+#   decoder  threads e atalhos do decodificador
+# 'pipe_buffer' é o buffer do pipe de quadros no Python (0 = readinto direto no pipe).
+# "input_options" do config.json continuam valendo e entram depois do perfil.
+INGEST_PROFILES = {
+    # Comportamento antigo: opções padrão do ffmpeg
+    "default": {},
+    # Menor atraso: sem buffer de entrada, sondagem curta e um único thread de
+    # decodificação (threads por quadro atrasam a saída em um quadro cada)
+    "low_latency": {
+        "rtsp": ['-rtsp_transport', 'tcp'],
+        "demux": ['-fflags', 'nobuffer', '-probesize', '65536', '-analyzeduration', '500000'],
+        "decoder": ['-flags', 'low_delay', '-threads', '1'],
+        "pipe_buffer": 0,
+    },
+    # Conexões instáveis: TCP, sondagem completa e pacotes corrompidos descartados
+    "robust_tcp": {
+        "rtsp": ['-rtsp_transport', 'tcp', '-rtsp_flags', 'prefer_tcp'],
+        "demux": ['-fflags', '+genpts+discardcorrupt', '-probesize', '5000000', '-analyzeduration', '5000000'],
+    },
+    # Menos CPU na decodificação: sem filtro de deblocking e com atalhos do decodificador
+    "low_cpu": {
+        "rtsp": ['-rtsp_transport', 'tcp'],
+        "demux": ['-probesize', '1000000', '-analyzeduration', '1000000'],
+        "decoder": ['-threads', '1', '-skip_loop_filter', 'all', '-flags2', '+fast'],
+    },
+}
+DEFAULT_PIPE_BUFFER = 10**8
+
+
+def ingest_profile(config):
+    name = config.get("ingest_profile", "default")
+    if name not in INGEST_PROFILES:
+        raise ValueError(f"Perfil de ingestão desconhecido: {name}")
+    return INGEST_PROFILES[name]
+
+
+def input_options(url, config, parts=("rtsp", "demux", "decoder")):
+    """Opções de entrada do perfil da câmera (só as 'parts' pedidas) mais as do config."""
+    profile = ingest_profile(config)
+    options = []
+    for part in parts:
+        if part == "rtsp" and not url.startswith("rtsp"):
+            continue
+        options += profile.get(part, [])
+    return options + list(config.get("input_options", []))
+
+
+def pipe_buffer_size(config):
+    return ingest_profile(config).get("pipe_buffer", DEFAULT_PIPE_BUFFER)
+
+
+def analysis_size(config):
+    """Retorna (largura, altura) de análise configurada, ou None para a resolução nativa."""
+    width = config.get("analysis_width")
+    height = config.get("analysis_height")
+    if width and height:
+        return int(width), int(height)
+    return None
+
+
+def sampling_enabled(config):
+    """Indica se o ffmpeg deve fazer a amostragem (taxa, escala ou só keyframes)."""
+    return bool(config.get("sample_fps")) or analysis_size(config) is not None or bool(config.get("keyframes_only"))
+
+
+def sampling_filters(config):
+    """Lista de filtros de vídeo (-vf) para a amostragem configurada."""
+    filters = []
+    sample_fps = config.get("sample_fps")
+    if sample_fps:
+        filters.append(f"fps={float(sample_fps):g}")
+    size = analysis_size(config)
+    if size is not None:
+        filters.append(f"scale={size[0]}:{size[1]}")
+    return filters
+
+
+def build_ffmpeg_command(url, config):
+    """Monta o comando ffmpeg que envia quadros bgr24 para o stdout.
+
+    Só o primeiro stream de vídeo (-map 0:v:0) é decodificado: o mesmo que o ffprobe
+    sonda, mesmo com substream ou capa anexada num MP4.
+    """
+    # Perfil de ingestão + opções extras, ex.: ["-re", "-stream_loop", "-1"] para fontes locais
+    options = input_options(url, config)
+    if not sampling_enabled(config):
+        # Caminho antigo: todos os quadros na resolução nativa
+        return ['ffmpeg'] + options + [
+            '-i', url, '-map', '0:v:0', '-loglevel', 'info', '-f', 'image2pipe',
+            '-pix_fmt', 'bgr24', '-vcodec', 'rawvideo', '-'
+        ]
+
+    command = ['ffmpeg', '-loglevel', 'info'] + options
+    if config.get("keyframes_only"):
+        # Decodifica apenas os keyframes; os demais quadros nem são decodificados
+        command += ['-skip_frame', 'nokey']
+    command += ['-i', url, '-map', '0:v:0', '-an']
+    filters = sampling_filters(config)
+    if filters:
+        command += ['-vf', ','.join(filters)]
+    command += ['-f', 'rawvideo', '-pix_fmt', 'bgr24', '-']
+    return command
+
+
+# --- ANEL DE QUADROS PRÉ-ALOCADOS ---
+# O leitor faz readinto() direto em buffers numpy reservados no início da conexão,
+# então a ingestão em regime não aloca nada por quadro. Cada quadro entregue ocupa
+# um slot do anel até que quem o recebeu chame release().
+
+class Frame:
+    """Quadro emprestado do anel. Chame release() quando não precisar mais dele."""
+    __slots__ = ("array", "timestamp", "_ring", "_slot")
+
+    def __init__(self, ring, slot, array):
+        self.array = array
+        self.timestamp = 0.0
+        self._ring = ring
+        self._slot = slot
+
+    def release(self):
+        """Devolve o slot ao anel. Chame uma única vez por quadro lido."""
+        ring, self._ring = self._ring, None
+        if ring is not None:
+            ring._free.append(self._slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """Anel de buffers bgr24 pré-alocados lidos com readinto() a partir do pipe do ffmpeg."""
+
+    def __init__(self, width, height, slots=3):
+        self.width = width
+        self.height = height
+        self.frame_bytes = width * height * 3
+        self.dropped = 0
+        # Bytes de um quadro incompleto no fim do fluxo (leitura curta)
+        self.partial = 0
+        buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(slots)]
+        self._views = [memoryview(buf).cast('B') for buf in buffers]
+        self._frames = [Frame(self, i, buf) for i, buf in enumerate(buffers)]
+        # deque.append/popleft são atômicos, então release() pode vir de outra thread
+        self._free = collections.deque(range(slots))
+        self._scratch = memoryview(bytearray(self.frame_bytes))
+
+    def _fill(self, stream, view):
+        """Preenche o buffer inteiro; retorna False se o stream terminar antes."""
+        filled = 0
+        while filled < self.frame_bytes:
+            n = stream.readinto(view[filled:])
+            if not n:
+                self.partial = filled
+                return False
+            filled += n
+        return True
+
+    def skip(self, stream):
+        """Consome um quadro sem entregá-lo (lido num buffer de descarte)."""
+        start = time.perf_counter()
+        filled = self._fill(stream, self._scratch)
+        # Inclui a espera pelo ffmpeg: um estágio lento aqui é a câmera/decodificação
+        profiling.record("pipe_skip", start)
+        if not filled:
+            raise EOFError("Fluxo do ffmpeg terminou no meio de um quadro")
+
+    def read(self, stream):
+        """Lê o próximo quadro num slot livre.
+
+        Retorna None (e descarta o quadro) se todos os slots ainda estiverem em uso.
+        Lança EOFError numa leitura curta.
+        """
+        try:
+            slot = self._free.popleft()
+        except IndexError:
+            self.dropped += 1
+            self.skip(stream)
+            return None
+        start = time.perf_counter()
+        filled = self._fill(stream, self._views[slot])
+        profiling.record("pipe_read", start)
+        if not filled:
+            self._free.append(slot)
+            raise EOFError("Fluxo do ffmpeg terminou no meio de um quadro")
+        frame = self._frames[slot]
+        frame._ring = self
+        frame.timestamp = time.time()
+        return frame
@@ -5,16 +5,27 @@ import os
 import cv2
 import threading
 import time
-import subprocess
-import numpy as np
 import shutil
-import winsound
 from PIL import Image, ImageTk
 import queue
-import re
+import collections
+from detection import model_files_exist, get_detector
+from postprocess import PostProcessor, PERSON_CLASS_ID, draw_detections
+from motion import MotionGate, crop
+from ingest import camera_url
+from pipeline import LatestQueue, Stage
+from supervisor import StreamSupervisor
+from recorder import ClipRecorder
+from tracker import Tracker, tracks_to_detections
+from zones import ZoneLayout
+from alerts import AlertBus
+from scheduler import SamplingScheduler
+import profiling
 
 # --- Caminho absoluto para o config.json, garantindo que funcione de qualquer lugar ---
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+# Tamanho do vídeo na janela; o estágio de publicação já entrega quadros RGB neste tamanho
+DISPLAY_SIZE = (640, 360)
 
 # --- CLASSE PARA A JANELA DE CONFIGURAÇÃO INICIAL (sem alterações) ---
 class SetupWindow:
@@ -89,10 +100,22 @@ class App:
         
         self.monitoring_thread = None
         self.stop_event = threading.Event()
-        self.last_alert_time = 0
-        self.alert_cooldown = 10 
+        # Alertas saem da thread de publicação sem esperar som, webhook ou script
+        self.alert_bus = AlertBus(config, on_sound=lambda: self.window.after(0, self.window.bell))
+        self.alert_bus.start()
         self.frame_queue = queue.Queue(maxsize=1)
-        self.detected_resolution = None
+        self.supervisor = None
+        self.recorder = None
+        self.tracker = None
+        self.scheduler = None
+        self.sampling_rate = None
+        # Estágios de inferência e publicação (criados a cada início de monitoramento)
+        self.stages = []
+        self.e2e_latency_ms = 0.0
+        # Renderização: um único PhotoImage/item do canvas, atualizado a cada quadro que chega
+        self.render_pending = False
+        self.render_ms = 0.0
+        self.render_times = collections.deque()
 
         # --- Interface Gráfica ---
         top_frame = tk.Frame(window)
@@ -111,10 +134,16 @@ class App:
         self.btn_stop = tk.Button(top_frame, text="■ Parar Monitoramento", command=self.stop_monitoring, state="disabled")
         self.btn_stop.pack(side="right")
 
-        self.video_canvas = tk.Canvas(window, width=640, height=360, bg="black")
+        self.video_canvas = tk.Canvas(window, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1], bg="black")
         self.video_canvas.pack(pady=10, padx=10)
+        self.photo = ImageTk.PhotoImage("RGB", DISPLAY_SIZE)
+        self.video_image = self.video_canvas.create_image(0, 0, image=self.photo, anchor=tk.NW, state="hidden")
         self.video_text = self.video_canvas.create_text(320, 180, text="Vídeo aparecerá aqui", fill="white", font=("Helvetica", 14))
 
+        # Profundidade de fila, descartes e latência de cada estágio
+        self.metrics_label = tk.Label(window, text="", font=("Helvetica", 9), anchor="w")
+        self.metrics_label.pack(padx=10, fill="x")
+
         audio_frame = tk.Frame(window)
         audio_frame.pack(pady=10, padx=10, fill="x")
         
@@ -125,7 +154,7 @@ class App:
         
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        self.update_video_canvas()
+        self.update_metrics_label()
 
     def start_monitoring(self):
         self.stop_event.clear()
@@ -134,177 +163,288 @@ class App:
         self.status_label.config(text="Status: Iniciando conexão...")
         self.video_canvas.delete(self.video_text)
 
-        self.monitoring_thread = threading.Thread(target=self.object_detection_loop)
+        # Perfil novo a cada início (config.json "profiling" ou HOUSE_CAM_PROFILE)
+        profiling.configure(self.config)
+        self.monitoring_thread = threading.Thread(target=self.run_monitoring, name="ingestão")
         self.monitoring_thread.daemon = True
         self.monitoring_thread.start()
 
+    def run_monitoring(self):
+        try:
+            profiling.call(self.object_detection_loop)
+        finally:
+            profiling.close()
+
     def stop_monitoring(self):
         self.stop_event.set()
         self.btn_start.config(state="normal")
         self.btn_stop.config(state="disabled")
         self.status_label.config(text="Status: Parado")
         self.person_count_label.config(text="Pessoas Detectadas: 0")
+        self.video_canvas.itemconfig(self.video_image, state="hidden")
         self.video_text = self.video_canvas.create_text(320, 180, text="Monitoramento parado", fill="white", font=("Helvetica", 14))
 
 
     def on_closing(self):
         if self.monitoring_thread and self.monitoring_thread.is_alive():
             self.stop_monitoring()
+        self.alert_bus.stop()
         self.window.destroy()
 
-    def trigger_alert(self):
-        current_time = time.time()
-        if current_time - self.last_alert_time > self.alert_cooldown:
-            self.last_alert_time = current_time
-            print("ALERTA: Pessoa detectada!")
-            winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS | winsound.SND_ASYNC)
-
-    def update_video_canvas(self):
+    @profiling.profiled
+    def render_frame(self):
+        """Desenha o quadro RGB mais recente no PhotoImage já existente (thread da GUI)."""
+        self.render_pending = False
         try:
-            frame = self.frame_queue.get_nowait()
-            frame_resized = cv2.resize(frame, (640, 360))
-            self.photo = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)))
-            self.video_canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+            rgb = self.frame_queue.get_nowait()
         except queue.Empty:
-            pass
-        
-        self.window.after(100, self.update_video_canvas)
-
-    def find_resolution_and_log(self, pipe_stderr):
-        for line in iter(pipe_stderr.readline, b''):
-            line_str = line.decode('utf-8', errors='ignore').strip()
-            print(f"[ffmpeg] {line_str}")
-            
-            if self.detected_resolution is None:
-                if 'Stream' in line_str and 'Video:' in line_str:
-                    match = re.search(r'(\d{3,4})x(\d{3,4})', line_str)
-                    if match:
-                        width, height = map(int, match.groups())
-                        print(f"SUCESSO: Resolução detectada automaticamente: {width}x{height}")
-                        self.detected_resolution = (width, height)
-        pipe_stderr.close()
+            return
+        start = time.perf_counter()
+        self.photo.paste(Image.fromarray(rgb))
+        self.video_canvas.itemconfig(self.video_image, state="normal")
+        end = time.perf_counter()
+        profiling.record("gui_render", start, end)
+        elapsed_ms = (end - start) * 1000
+        self.render_ms = 0.9 * self.render_ms + 0.1 * elapsed_ms if self.render_ms else elapsed_ms
+
+        now = time.monotonic()
+        self.render_times.append(now)
+        while self.render_times and now - self.render_times[0] > 1:
+            self.render_times.popleft()
+
+    def show_frame(self, rgb):
+        """Entrega um quadro RGB para a tela e agenda um redesenho (qualquer thread)."""
+        try:
+            self.frame_queue.put_nowait(rgb)
+        except queue.Full:
+            # O quadro antigo nunca será exibido
+            try:
+                self.frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.frame_queue.put_nowait(rgb)
+        if not self.render_pending:
+            self.render_pending = True
+            self.window.after(0, self.render_frame)
+
+    def update_metrics_label(self):
+        try:
+            self._update_metrics_label()
+        finally:
+            # Uma falha aqui não pode parar a atualização pelo resto da sessão
+            self.window.after(1000, self.update_metrics_label)
+
+    def _update_metrics_label(self):
+        if self.stages and self.supervisor is not None and self.monitoring_thread and self.monitoring_thread.is_alive():
+            parts = [f"{stage.name}: fila {m['queue_depth']}, descartes {m['drops']}, {m['latency_ms']:.0f} ms"
+                     for stage, m in ((stage, stage.metrics()) for stage in self.stages)]
+            parts.append(f"ponta a ponta: {self.e2e_latency_ms:.0f} ms")
+            parts.append(f"render: {len(self.render_times)} fps, {self.render_ms:.1f} ms/quadro")
+            stream = self.supervisor.metrics()
+            parts.append(f"reconexões: {stream['reconnects']} ({stream['downtime_s']:.0f} s fora)")
+            rate = self.scheduler.camera_metrics(self.sampling_rate)
+            if rate["target_fps"] is not None:
+                parts.append(f"análise: {rate['effective_fps']:.1f}/{rate['target_fps']:.1f} fps")
+            self.metrics_label.config(text=" | ".join(parts))
+
+    def pipeline_metrics(self):
+        """Métricas por estágio e latência ponta a ponta (quadro lido -> publicado)."""
+        metrics = {stage.name: stage.metrics() for stage in self.stages}
+        metrics["e2e_latency_ms"] = round(self.e2e_latency_ms, 1)
+        metrics["render"] = {"fps": len(self.render_times), "ms_per_frame": round(self.render_ms, 2)}
+        if self.supervisor is not None:
+            metrics["stream"] = self.supervisor.metrics()
+        metrics["alerts"] = self.alert_bus.metrics()
+        if self.scheduler is not None:
+            metrics["sampling"] = self.scheduler.metrics()
+        return metrics
+
+    def run_inference(self, item):
+        """Estágio de inferência: rede + pós-processamento no quadro (ou na ROI de movimento).
+
+        Com rastreamento, a rede roda a cada 'detect_every' quadros e as trilhas cobrem
+        os intervalos. Devolve (quadro, detecções, IDs das trilhas, pessoas que entraram).
+        """
+        frame_slot, roi = item
+        tracker = self.tracker
+        if tracker is not None and not tracker.needs_detection():
+            with profiling.stage("tracker"):
+                tracks = tracker.predict(frame_slot.array)
+            return frame_slot, tracks_to_detections(tracks), [track.track_id for track in tracks], 0
+        print(f"Processando quadro para detecção de pessoas em: {time.strftime('%H:%M:%S')}")
+        start = time.perf_counter()
+        if self.zones.enabled:
+            # Blocos na resolução da rede só nas zonas ativas, em um lote
+            found = self.zones.detect(self.detector, self.postprocess, frame_slot.array, roi)
+        else:
+            region = crop(frame_slot.array, roi)
+            (h, w) = region.shape[:2]
+            detections = self.detector.detect(region)
+            with profiling.stage("postprocess"):
+                found = self.postprocess(detections, w, h, origin=roi[:2] if roi else (0, 0))
+        self.scheduler.record(self.sampling_rate, (time.perf_counter() - start) * 1000)
+        if found.count(PERSON_CLASS_ID):
+            self.sampling_rate.note_activity()
+        if tracker is None:
+            return frame_slot, found, None, found.count(PERSON_CLASS_ID)
+        with profiling.stage("tracker"):
+            tracks, entered = tracker.update(found, frame_slot.array)
+        new_people = sum(1 for track in entered if track.class_id == PERSON_CLASS_ID)
+        return frame_slot, tracks_to_detections(tracks), [track.track_id for track in tracks], new_people
+
+    def publish_result(self, item):
+        """Estágio de publicação: desenha, atualiza a GUI, alerta e entrega o quadro ao canvas."""
+        frame_slot, found, track_ids, new_people = item
+        with profiling.stage("draw"):
+            draw_detections(frame_slot.array, found, track_ids)
+        # Redimensiona e converte aqui, fora do thread da GUI; o slot volta logo para o anel
+        with profiling.stage("display_convert"):
+            rgb = cv2.cvtColor(cv2.resize(frame_slot.array, DISPLAY_SIZE), cv2.COLOR_BGR2RGB)
+        captured_at = frame_slot.timestamp
+        frame_slot.release()
+        person_count = found.count(PERSON_CLASS_ID)
+
+        # Atualiza o label do contador na GUI
+        self.window.after(0, lambda: self.person_count_label.config(text=f"Pessoas Detectadas: {person_count}"))
+
+        # Com rastreamento, só uma pessoa que acabou de entrar dispara o alerta
+        if new_people > 0:
+            self.alert_bus.publish(self.config.get("ip") or "camera", new_people, captured_at)
+        if person_count > 0 and self.recorder is not None:
+            self.recorder.trigger(captured_at)
+
+        latency_ms = (time.time() - captured_at) * 1000
+        self.e2e_latency_ms = 0.9 * self.e2e_latency_ms + 0.1 * latency_ms if self.e2e_latency_ms else latency_ms
+
+        self.show_frame(rgb)
+
+    def set_status(self, text):
+        """Atualiza o status a partir de qualquer thread."""
+        self.window.after(0, lambda: self.status_label.config(text=f"Status: {text}"))
 
     def object_detection_loop(self):
-        prototxt_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MobileNetSSD_deploy.prototxt')
-        model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'MobileNetSSD_deploy.caffemodel')
-
-        if not os.path.exists(prototxt_path) or not os.path.exists(model_path):
+        if not model_files_exist(self.config):
             self.status_label.config(text="Status: Arquivos do modelo não encontrados!")
             self.stop_monitoring()
             self.window.after(0, lambda: messagebox.showerror("Erro", "Não foi possível encontrar os arquivos do modelo de IA. Baixe 'MobileNetSSD_deploy.prototxt' e 'MobileNetSSD_deploy.caffemodel' e coloque na mesma pasta do script."))
             return
 
-        net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
+        # Carregada e aquecida uma vez; reiniciar o monitoramento reaproveita a mesma rede
+        try:
+            self.detector = get_detector(self.config)
+        except RuntimeError as error:
+            # Backend/target indisponível: avisa e volta os botões ao estado parado
+            message = str(error)
+            self.window.after(0, self.stop_monitoring)
+            self.window.after(0, lambda: self.status_label.config(text="Status: Falha ao carregar o modelo!"))
+            self.window.after(0, lambda: messagebox.showerror("Erro", message))
+            return
         
         if shutil.which("ffmpeg") is None:
             self.status_label.config(text="Status: ffmpeg não encontrado!")
             self.stop_monitoring()
             return
 
-        url = f'rtsp://{self.config["usuario"]}:{self.config["senha"]}@{self.config["ip"]}:{self.config["porta"]}/{self.config["stream_path"]}'
+        url = camera_url(self.config)
+        # Só com 'sample_fps' o ffmpeg limita a taxa e todo quadro entregue já é um quadro a
+        # analisar; só a escala (analysis_width/height) ou keyframes_only não limitam a taxa
+        sampling = bool(self.config.get("sample_fps"))
+        # Filtro de movimento: avalia todo quadro barato e só chama a rede quando há movimento
+        gate = MotionGate(self.config) if self.config.get("motion_gate") else None
+        self.postprocess = PostProcessor(self.config)
+        self.tracker = Tracker(self.config) if self.config.get("tracking", True) else None
+        self.zones = ZoneLayout(self.config)
+        # Taxa de análise: sobe com movimento ou pessoa e decai na cena parada. Sem o
+        # agendador, analisa todo quadro amostrado/com movimento ou um a cada capture_interval s
+        self.scheduler = SamplingScheduler(self.config)
+        fixed_fps = None if sampling or gate is not None else 1 / self.config.get("capture_interval", 10)
+        rate = self.sampling_rate = self.scheduler.add(self.config.get("ip") or "camera", self.config, fixed_fps)
+
+        # Ingestão (este thread) -> inferência -> publicação, com filas limitadas entre eles.
+        # Uma inferência lenta não trava mais a leitura do pipe: o quadro mais recente vence.
+        def release(item):
+            item[0].release()
+
+        infer_policy = self.config.get("infer_drop_policy", "drop_oldest")
+        if infer_policy == "block":
+            # Parado na fila, o leitor não esvazia o pipe e o supervisor veria um travamento
+            print("infer_drop_policy 'block' não vale na entrada (leitura do pipe); usando 'drop_oldest'.")
+            infer_policy = "drop_oldest"
+        infer_queue = LatestQueue(self.config.get("infer_queue_size", 1), infer_policy, on_drop=release,
+                                  name="inferência")
+        publish_queue = LatestQueue(self.config.get("publish_queue_size", 1),
+                                    self.config.get("publish_drop_policy", "drop_oldest"), on_drop=release,
+                                    name="publicação")
+        # Slots: leitura, filas e um em cada estágio (a tela recebe cópias RGB)
+        ring_slots = infer_queue.maxsize + publish_queue.maxsize + 3
         
-        # Loop principal para reconexão
+        def on_connect():
+            # O fundo aprendido não vale para uma nova conexão
+            if gate is not None:
+                gate.reset()
+            if self.tracker is not None:
+                self.tracker.reset()
+
+        # Clipes de evento: um segundo ffmpeg guarda os últimos segundos do stream comprimido
+        self.recorder = ClipRecorder(url, self.config, self.config.get("ip") or "camera") if self.config.get("record_clips") else None
+        if self.recorder is not None:
+            self.recorder.start()
+
+        # Reconecta só em falhas reais (travamento, leitura curta, ffmpeg encerrado)
+        self.supervisor = StreamSupervisor(url, self.config, self.stop_event, ring_slots=ring_slots,
+                                           on_connect=on_connect, on_status=self.set_status)
+        # Os estágios só são publicados com o supervisor pronto: update_metrics_label lê os dois
+        self.e2e_latency_ms = 0.0
+        self.stages = [
+            Stage("inferência", infer_queue, self.run_inference, publish_queue, self.stop_event),
+            Stage("publicação", publish_queue, self.publish_result, None, self.stop_event),
+        ]
+        for stage in self.stages:
+            stage.start()
+
+        # Loop de ingestão: lê quadros e entrega os que serão analisados ao estágio de inferência
         while not self.stop_event.is_set():
-            print("Iniciando nova conexão com a câmera...")
-            command = [
-                'ffmpeg', '-i', url, '-loglevel', 'info', '-f', 'image2pipe',
-                '-pix_fmt', 'bgr24', '-vcodec', 'rawvideo', '-'
-            ]
-
             try:
-                pipe = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=10**8)
-                
-                self.detected_resolution = None
-                error_thread = threading.Thread(target=self.find_resolution_and_log, args=(pipe.stderr,))
-                error_thread.daemon = True
-                error_thread.start()
-
+                # Sem filtro de movimento, quadro fora da hora nem é copiado do pipe
+                frame_slot = self.supervisor.read(skip=gate is None and not self.scheduler.due(rate))
             except FileNotFoundError:
-                self.status_label.config(text="Status: ffmpeg não encontrado!")
-                self.stop_monitoring()
-                return
-
-            wait_start_time = time.time()
-            while self.detected_resolution is None:
-                time.sleep(0.1)
-                if time.time() - wait_start_time > 15:
-                    self.status_label.config(text="Status: Timeout ao detectar resolução.")
-                    pipe.terminate()
-                    time.sleep(5)
-                    # continue o loop de reconexão
-                    continue
-            
-            width, height = self.detected_resolution
-            self.status_label.config(text="Status: Monitorando...")
-            
-            last_capture_time = time.time()
-            capture_interval = 10 # Segundos
-
-            # NOVO: Timer para reconexão periódica
-            reconnect_interval = 120 # 2 minutos
-            connection_start_time = time.time()
-
-            # Loop interno para processamento de quadros
-            while not self.stop_event.is_set():
-                if time.time() - connection_start_time > reconnect_interval:
-                    print("Tempo de 2 minutos atingido. Forçando reconexão...")
-                    break # Sai do loop de processamento para reconectar
-
-                raw_image = pipe.stdout.read(width * height * 3)
-                if len(raw_image) != (width * height * 3):
-                    print("Erro no fluxo de dados do ffmpeg. Tentando reconectar...")
+                self.set_status("ffmpeg não encontrado!")
+                self.window.after(0, self.stop_monitoring)
+                break
+            if frame_slot is None:
+                if self.supervisor.finished:
+                    # "reconnect": false e o stream acabou: read() só devolveria None daqui em diante
+                    self.stop_event.set()
+                    self.window.after(0, self.stop_monitoring)
                     break
+                continue
+
+            frame = frame_slot.array
 
-                current_time = time.time()
-                if current_time - last_capture_time < capture_interval:
+            roi = None
+            if gate is not None:
+                with profiling.stage("motion"):
+                    moving, roi = gate.check(frame)
+                if not moving:
+                    frame_slot.release()
                     continue
-                
-                last_capture_time = current_time
-                print(f"Processando quadro para detecção de pessoas em: {time.strftime('%H:%M:%S')}")
-
-                frame = np.frombuffer(raw_image, dtype='uint8').reshape((height, width, 3))
-
-                (h, w) = frame.shape[:2]
-                blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
-                
-                net.setInput(blob)
-                detections = net.forward()
-
-                person_count = 0
-                for i in np.arange(0, detections.shape[2]):
-                    confidence = detections[0, 0, i, 2]
-                    
-                    if confidence > 0.5:
-                        idx = int(detections[0, 0, i, 1])
-                        if idx == 15: # Índice para "pessoa"
-                            person_count += 1
-                            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                            (startX, startY, endX, endY) = box.astype("int")
-                            
-                            label = f"Pessoa: {confidence:.2%}"
-                            cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
-                            y = startY - 15 if startY - 15 > 15 else startY + 15
-                            cv2.putText(frame, label, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-                # Atualiza o label do contador na GUI
-                self.window.after(0, lambda: self.person_count_label.config(text=f"Pessoas Detectadas: {person_count}"))
-
-                if person_count > 0:
-                    self.window.after(0, self.trigger_alert)
-
-                try:
-                    self.frame_queue.put_nowait(frame)
-                except queue.Full:
-                    self.frame_queue.get_nowait()
-                    self.frame_queue.put_nowait(frame)
-            
-            # Finaliza o processo ffmpeg antes de reconectar ou parar
-            pipe.terminate()
-            print("Processo ffmpeg da conexão atual finalizado.")
-            if not self.stop_event.is_set():
-                self.status_label.config(text="Status: Reconectando...")
-                time.sleep(2)
+                hit_rate = gate.hit_rate
+                self.set_status(f"Monitorando... (movimento em {hit_rate:.0%} dos quadros)")
+                rate.note_activity()
+                if not self.scheduler.due(rate):
+                    frame_slot.release()
+                    continue
+
+            self.scheduler.mark(rate)
+            infer_queue.put((frame_slot, roi), self.stop_event)
 
+        self.supervisor.close()
+        for stage in self.stages:
+            stage.join(timeout=5)
+        infer_queue.clear()
+        publish_queue.clear()
+        if self.recorder is not None:
+            self.recorder.stop()
         print("Monitoramento encerrado.")
 
 # --- INICIALIZAÇÃO DA APLICAÇÃO ---
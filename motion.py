@@ -0,0 +1,107 @@
+"""Filtro barato de movimento na frente da MobileNet-SSD.
+
+Cada quadro é reduzido para tons de cinza em baixa resolução e comparado com um
+fundo médio (diferença vetorizada em NumPy) ou passado a um subtrator de fundo
+MOG2. A rede só roda quando a área em movimento passa do limite configurado e,
+opcionalmente, só no recorte (ROI) onde houve movimento.
+
+Chaves do config.json:
+    motion_gate       liga o filtro (padrão false)
+    motion_backend    "diff" (padrão) ou "mog2"
+    motion_width      largura da imagem reduzida usada no filtro (padrão 160)
+    motion_threshold  diferença mínima de cinza para um pixel contar como movimento (padrão 25)
+    motion_min_area   fração mínima da imagem em movimento para acionar a rede (padrão 0.005)
+    motion_roi        roda a rede só no recorte com movimento (padrão false)
+    motion_learning_rate  velocidade com que o fundo se adapta (padrão 0.05)
+"""
+import cv2
+import numpy as np
+
+from detection import INPUT_SIZE
+
+
+class MotionGate:
+    def __init__(self, config):
+        self.backend = config.get("motion_backend", "diff")
+        self.width = int(config.get("motion_width", 160))
+        self.threshold = config.get("motion_threshold", 25)
+        self.min_area = config.get("motion_min_area", 0.005)
+        self.use_roi = bool(config.get("motion_roi", False))
+        self.learning_rate = config.get("motion_learning_rate", 0.05)
+        # A ROI não fica menor que a entrada da rede, para não ampliar o recorte
+        self.min_roi = int(config.get("input_size", INPUT_SIZE))
+        self.background = None
+        self.subtractor = None
+        if self.backend == "mog2":
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+        # Estatísticas
+        self.frames = 0
+        self.hits = 0
+
+    def reset(self):
+        """Esquece o fundo aprendido (ex.: numa reconexão), mantendo as estatísticas."""
+        self.background = None
+        if self.subtractor is not None:
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.frames if self.frames else 0.0
+
+    def _mask(self, small):
+        if self.subtractor is not None:
+            return self.subtractor.apply(small, learningRate=self.learning_rate) > 0
+
+        gray = small.astype(np.float32)
+        if self.background is None:
+            self.background = gray
+            return np.zeros(gray.shape, dtype=bool)
+        mask = np.abs(gray - self.background) > self.threshold
+        # Média móvel: o fundo acompanha mudanças lentas de luz
+        self.background += self.learning_rate * (gray - self.background)
+        return mask
+
+    def check(self, frame):
+        """Retorna (houve_movimento, roi) para o quadro BGR.
+
+        roi é (startX, startY, endX, endY) em coordenadas do quadro, ou None para o
+        quadro inteiro (sem movimento ou motion_roi desligado).
+        """
+        (h, w) = frame.shape[:2]
+        small_h = max(1, round(h * self.width / w))
+        small = cv2.cvtColor(cv2.resize(frame, (self.width, small_h), interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        mask = self._mask(small)
+
+        self.frames += 1
+        if mask.mean() < self.min_area:
+            return False, None
+        self.hits += 1
+        if not self.use_roi:
+            return True, None
+
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        scale_x, scale_y = w / self.width, h / small_h
+        roi = (int(cols[0] * scale_x), int(rows[0] * scale_y),
+               int((cols[-1] + 1) * scale_x), int((rows[-1] + 1) * scale_y))
+        return True, expand_roi(roi, w, h, min_size=self.min_roi)
+
+
+def expand_roi(roi, w, h, margin=0.25, min_size=INPUT_SIZE):
+    """Aumenta o recorte com uma margem e um tamanho mínimo, dentro do quadro."""
+    (startX, startY, endX, endY) = roi
+    box_w = max(int((endX - startX) * (1 + 2 * margin)), min(min_size, w))
+    box_h = max(int((endY - startY) * (1 + 2 * margin)), min(min_size, h))
+    center_x, center_y = (startX + endX) // 2, (startY + endY) // 2
+    startX = min(max(0, center_x - box_w // 2), max(0, w - box_w))
+    startY = min(max(0, center_y - box_h // 2), max(0, h - box_h))
+    return startX, startY, min(w, startX + box_w), min(h, startY + box_h)
+
+
+def crop(frame, roi):
+    """Recorte (view, sem cópia) do quadro para a ROI; roi None devolve o quadro inteiro."""
+    if roi is None:
+        return frame
+    (startX, startY, endX, endY) = roi
+    return frame[startY:endY, startX:endX]
@@ -0,0 +1,132 @@
+"""Estágios desacoplados (ingestão / inferência / publicação) ligados por filas limitadas.
+
+Cada estágio roda no seu thread e lê de uma LatestQueue. Quando a fila enche, a
+política de descarte decide o que acontece:
+    "drop_oldest"  descarta o item mais antigo (o mais recente sempre vence, padrão)
+    "drop_newest"  descarta o item que está chegando
+    "block"        espera espaço (o produtor fica parado, como no laço serial antigo)
+Itens descartados são passados para on_drop, para que quadros voltem ao anel.
+Com o perfil ligado (profiling.py), o tempo de cada item na fila entra como
+"queue_wait:<nome>" e o da função de cada estágio como "stage:<nome>".
+"""
+import collections
+import threading
+import time
+import traceback
+
+import profiling
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class LatestQueue:
+    """Fila limitada com política de descarte e contadores de profundidade e descartes."""
+
+    def __init__(self, maxsize=1, policy="drop_oldest", on_drop=None, name="fila"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte desconhecida: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_drop = on_drop
+        self.name = name
+        self.drops = 0
+        # (horário de entrada, item)
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item, stop_event=None):
+        dropped = None
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    dropped = self._items.popleft()[1]
+                    break
+                if self.policy == "drop_newest":
+                    dropped, item = item, None
+                    break
+                if stop_event is not None and stop_event.is_set():
+                    dropped, item = item, None
+                    break
+                self._cond.wait(0.1)
+            if item is not None:
+                self._items.append((time.perf_counter(), item))
+                self._cond.notify_all()
+        if dropped is not None:
+            self.drops += 1
+            if self.on_drop is not None:
+                self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        """Retorna o próximo item, ou None se nada chegar dentro do timeout."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+                if not self._items:
+                    return None
+            enqueued, item = self._items.popleft()
+            self._cond.notify_all()
+        profiling.record(f"queue_wait:{self.name}", enqueued)
+        return item
+
+    def clear(self):
+        with self._cond:
+            items = [item for _, item in self._items]
+            self._items.clear()
+            self._cond.notify_all()
+        if self.on_drop is not None:
+            for item in items:
+                self.on_drop(item)
+
+
+class Stage(threading.Thread):
+    """Thread que aplica 'function' a cada item da fila de entrada.
+
+    O resultado (se não for None) segue para a fila de saída. A latência por item é
+    acompanhada por média móvel exponencial. Uma exceção em 'function' é registrada e
+    o item volta pelo on_drop da fila de entrada (o quadro retorna ao anel); o
+    estágio segue com o próximo item.
+    """
+
+    def __init__(self, name, inbox, function, outbox=None, stop_event=None):
+        super().__init__(daemon=True, name=name)
+        self.inbox = inbox
+        self.function = function
+        self.outbox = outbox
+        self.stop_event = stop_event or threading.Event()
+        self.processed = 0
+        self.errors = 0
+        self.latency_ms = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self.inbox.get(timeout=0.1)
+            if item is None:
+                continue
+            start = time.perf_counter()
+            try:
+                result = profiling.call(self.function, item)
+            except Exception:
+                self.errors += 1
+                print(f"[{self.name}] Erro ao processar item:\n{traceback.format_exc()}", end="")
+                if self.inbox.on_drop is not None:
+                    self.inbox.on_drop(item)
+                continue
+            end = time.perf_counter()
+            profiling.record(f"stage:{self.name}", start, end)
+            elapsed_ms = (end - start) * 1000
+            self.latency_ms = elapsed_ms if not self.processed else 0.9 * self.latency_ms + 0.1 * elapsed_ms
+            self.processed += 1
+            if result is not None and self.outbox is not None:
+                self.outbox.put(result, self.stop_event)
+
+    def metrics(self):
+        return {
+            "queue_depth": len(self.inbox),
+            "drops": self.inbox.drops,
+            "latency_ms": round(self.latency_ms, 1),
+            "processed": self.processed,
+            "errors": self.errors,
+        }
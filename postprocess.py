@@ -0,0 +1,138 @@
+"""Pós-processamento vetorizado da saída da MobileNet-SSD.
+
+A saída do DetectionOutput é um tensor 1x1xNx7 com linhas
+[id_imagem, classe, confiança, x1, y1, x2, y2] (coordenadas normalizadas). Aqui ele
+é filtrado por classe e confiança com máscaras NumPy, opcionalmente passa por NMS,
+e vira um lote compacto de detecções (Detections).
+
+Chaves do config.json:
+    detect_classes        classes a manter, por índice ou nome (padrão ["pessoa"])
+    confidence_threshold  confiança mínima (padrão 0.5)
+    nms_threshold         IoU máximo entre caixas da mesma classe; null desliga (padrão)
+"""
+import cv2
+import numpy as np
+
+# Classes do VOC na ordem da MobileNet-SSD
+CLASSES = ("fundo", "avião", "bicicleta", "pássaro", "barco", "garrafa", "ônibus", "carro", "gato",
+           "cadeira", "vaca", "mesa", "cachorro", "cavalo", "moto", "pessoa", "vaso de planta",
+           "ovelha", "sofá", "trem", "monitor")
+CLASSES_EN = ("background", "aeroplane", "bicycle", "bird", "boat", "bottle", "bus", "car", "cat",
+              "chair", "cow", "diningtable", "dog", "horse", "motorbike", "person", "pottedplant",
+              "sheep", "sofa", "train", "tvmonitor")
+PERSON_CLASS_ID = 15  # Índice para "pessoa"
+CONFIDENCE_THRESHOLD = 0.5
+
+
+class Detections:
+    """Lote de detecções de um quadro, guardado em arrays.
+
+    boxes: int32 Nx4 (startX, startY, endX, endY) em pixels do quadro
+    scores: float32 N
+    class_ids: int32 N
+    """
+    __slots__ = ("boxes", "scores", "class_ids")
+
+    def __init__(self, boxes, scores, class_ids):
+        self.boxes = boxes
+        self.scores = scores
+        self.class_ids = class_ids
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 4), np.int32), np.empty(0, np.float32), np.empty(0, np.int32))
+
+    @classmethod
+    def concatenate(cls, parts):
+        parts = list(parts)
+        if not parts:
+            return cls.empty()
+        return cls(np.concatenate([part.boxes for part in parts]), np.concatenate([part.scores for part in parts]),
+                   np.concatenate([part.class_ids for part in parts]))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __iter__(self):
+        """Itera como (classe, confiança, (startX, startY, endX, endY))."""
+        for class_id, score, box in zip(self.class_ids.tolist(), self.scores.tolist(), self.boxes.tolist()):
+            yield class_id, score, tuple(box)
+
+    def count(self, class_id=PERSON_CLASS_ID):
+        return int(np.count_nonzero(self.class_ids == class_id))
+
+    def select(self, mask):
+        return Detections(self.boxes[mask], self.scores[mask], self.class_ids[mask])
+
+
+def resolve_class(name_or_id):
+    """Aceita índice ou nome (português ou inglês do VOC) de uma classe."""
+    if isinstance(name_or_id, int):
+        return name_or_id
+    name = str(name_or_id).lower()
+    if name in CLASSES:
+        return CLASSES.index(name)
+    if name in CLASSES_EN:
+        return CLASSES_EN.index(name)
+    raise ValueError(f"Classe desconhecida: {name_or_id}")
+
+
+def nms(boxes, scores, class_ids, threshold):
+    """Índices mantidos por um NMS guloso, feito separadamente para cada classe."""
+    if len(scores) == 0:
+        return np.empty(0, np.int64)
+    # Desloca cada classe para uma região própria; caixas de classes diferentes nunca se
+    # sobrepõem. O passo é a extensão total das coordenadas: caixas na borda podem ser negativas
+    shift = (float(boxes.max()) - float(boxes.min()) + 1) * class_ids.astype(np.float64)
+    x1, y1, x2, y2 = (boxes[:, i] + shift for i in range(4))
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        w = (np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest])).clip(0)
+        h = (np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest])).clip(0)
+        inter = w * h
+        iou = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= threshold]
+    return np.array(keep, np.int64)
+
+
+class PostProcessor:
+    """Filtra a saída da rede segundo as classes, confiança e NMS configurados."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.class_ids = np.array([resolve_class(c) for c in config.get("detect_classes", [PERSON_CLASS_ID])], np.int32)
+        self.confidence = config.get("confidence_threshold", CONFIDENCE_THRESHOLD)
+        self.nms_threshold = config.get("nms_threshold")
+
+    def __call__(self, detections, w, h, origin=(0, 0)):
+        """Converte o tensor 1x1xNx7 de um quadro w x h em Detections.
+
+        'origin' desloca as caixas quando a rede rodou num recorte do quadro.
+        """
+        rows = detections.reshape(-1, 7)
+        mask = (rows[:, 2] > self.confidence) & np.isin(rows[:, 1].astype(np.int32), self.class_ids)
+        rows = rows[mask]
+        scale = np.array([w, h, w, h], np.float32)
+        boxes = (rows[:, 3:7] * scale).astype(np.int32) + np.array([origin[0], origin[1], origin[0], origin[1]], np.int32)
+        found = Detections(boxes, rows[:, 2].astype(np.float32), rows[:, 1].astype(np.int32))
+        if self.nms_threshold is not None and len(found) > 1:
+            found = found.select(nms(found.boxes, found.scores, found.class_ids, self.nms_threshold))
+        return found
+
+
+def draw_detections(frame, found, track_ids=None):
+    """Desenha as caixas e rótulos das detecções no próprio quadro.
+
+    Com 'track_ids' (um por detecção), o rótulo mostra o ID da trilha.
+    """
+    for i, (class_id, confidence, (startX, startY, endX, endY)) in enumerate(found):
+        label = f"{CLASSES[class_id].capitalize()}: {confidence:.2%}"
+        if track_ids is not None:
+            label = f"#{track_ids[i]} {label}"
+        cv2.rectangle(frame, (startX, startY), (endX, endY), (0, 255, 0), 2)
+        y = startY - 15 if startY - 15 > 15 else startY + 15
+        cv2.putText(frame, label, (startX, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
@@ -0,0 +1,103 @@
+"""Sondagem do stream com ffprobe (JSON) e cache do resultado por URL.
+
+Em vez de garimpar o stderr do ffmpeg com regex, o ffprobe devolve codec,
+resolução, fps e formato de pixel do primeiro stream de vídeo. O resultado fica
+em cache por URL, então as reconexões começam a ler quadros direto, sem esperar
+uma nova sondagem. O supervisor invalida a entrada quando a conexão mostra outra
+resolução.
+"""
+import collections
+import json
+import re
+import subprocess
+import threading
+
+StreamInfo = collections.namedtuple("StreamInfo", "codec width height fps pix_fmt")
+
+# Opções só do ffmpeg que o ffprobe não aceita (opção, número de argumentos)
+FFMPEG_ONLY_OPTIONS = {"-re": 0, "-stream_loop": 1}
+
+# Resolução na linha "Stream #0:0...: Video: h264 (...), yuv420p(...), 1920x1080 [SAR 1:1 DAR 16:9], ..."
+VIDEO_LINE_RESOLUTION = re.compile(r'Video:.*?\b(\d{2,5})x(\d{2,5})\b')
+
+
+def _parse_rate(rate):
+    """'25/1' -> 25.0; '0/0' ou vazio -> None."""
+    try:
+        num, den = (float(part) for part in rate.split('/'))
+        return num / den if num and den else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def probe_options(input_options):
+    """Remove das opções de entrada as que só o ffmpeg entende."""
+    options = []
+    skip = 0
+    for option in input_options:
+        if skip:
+            skip -= 1
+            continue
+        if option in FFMPEG_ONLY_OPTIONS:
+            skip = FFMPEG_ONLY_OPTIONS[option]
+            continue
+        options.append(option)
+    return options
+
+
+def probe_stream(url, input_options=(), timeout=15):
+    """StreamInfo do primeiro stream de vídeo, ou None se o ffprobe falhar."""
+    command = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=codec_name,width,height,pix_fmt,avg_frame_rate,r_frame_rate',
+        '-of', 'json'
+    ] + probe_options(input_options) + [url]
+    try:
+        result = subprocess.run(command, capture_output=True, timeout=timeout)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        streams = json.loads(result.stdout).get("streams") or []
+    except json.JSONDecodeError:
+        return None
+    if not streams or not streams[0].get("width"):
+        return None
+    stream = streams[0]
+    fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate"))
+    return StreamInfo(stream.get("codec_name"), int(stream["width"]), int(stream["height"]), fps, stream.get("pix_fmt"))
+
+
+def resolution_from_log(line):
+    """(largura, altura) de uma linha 'Stream ... Video:' do log do ffmpeg, ou None."""
+    if 'Stream' not in line:
+        return None
+    match = VIDEO_LINE_RESOLUTION.search(line)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+class ProbeCache:
+    """Cache de StreamInfo por URL, compartilhado entre conexões do mesmo processo."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, input_options=(), timeout=15):
+        """StreamInfo em cache, ou sonda agora e guarda o resultado."""
+        with self._lock:
+            info = self._entries.get(url)
+        if info is None:
+            info = probe_stream(url, input_options, timeout)
+            if info is not None:
+                with self._lock:
+                    self._entries[url] = info
+        return info
+
+    def invalidate(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+
+
+PROBE_CACHE = ProbeCache()
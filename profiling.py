@@ -0,0 +1,328 @@
+"""Perfil do caminho quente: tempo por estágio, histogramas, resumos periódicos e trace.
+
+Liga com "profiling": true no config.json ou com a variável de ambiente
+HOUSE_CAM_PROFILE (que tem precedência: 1 ou timers, sample, cprofile; 0 desliga).
+Desligado, stage() devolve um contexto vazio compartilhado e record() retorna na
+primeira linha: o custo no caminho quente é uma chamada de função.
+
+Cada estágio instrumentado (leitura do pipe, resize, blobFromImage, forward,
+pós-processamento, desenho, espera nas filas, render da GUI...) acumula contagem,
+total, máximo e um histograma em escala logarítmica, de onde saem p50/p90/p99. A
+cada 'profile_interval_s' segundos (padrão 30) o resumo vai para o console e para
+'profile_path' (JSON, padrão profile.json ao lado do script). Com 'profile_trace'
+(caminho), cada medição também vira um evento no formato de trace do Chrome
+(chrome://tracing ou ui.perfetto.dev), com um trilho por thread; o arquivo é
+regravado a cada resumo e guarda os 'profile_trace_events' mais recentes (padrão
+200000).
+
+Modos além dos temporizadores ("profiling": "<modo>" ou HOUSE_CAM_PROFILE=<modo>):
+    sample    um thread amostra a pilha de todos os threads a cada 'profile_sample_ms'
+              (padrão 10) e grava pilhas colapsadas em 'profile_stacks' (padrão
+              profile_stacks.txt), o formato do flamegraph.pl/speedscope e do
+              py-spy record --format raw
+    cprofile  cProfile nos threads do pipeline; o .prof vai para 'profile_cprofile'
+              (padrão profile.prof) ao encerrar: python -m pstats profile.prof
+Os threads têm nome (ingest-<câmera>, despachante, resultados, inferência,
+publicação...), então py-spy dump/top também separam os estágios.
+"""
+import bisect
+import cProfile
+import collections
+import contextlib
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_VAR = "HOUSE_CAM_PROFILE"
+MODES = ("timers", "sample", "cprofile")
+# Limites superiores dos baldes em ms: 0.01 ms a ~42 s, dois baldes por oitava
+BUCKETS_MS = [0.01 * 2 ** (i / 2) for i in range(45)]
+
+_NULL = contextlib.nullcontext()
+
+
+def _mode(config):
+    value = os.environ.get(ENV_VAR)
+    if value is None:
+        value = config.get("profiling", False)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("", "0", "false", "off", "no"):
+            return None
+        return value if value in MODES else "timers"
+    return "timers" if value else None
+
+
+class StageStats:
+    """Contagem, total, máximo e histograma de um estágio."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def percentile(self, fraction):
+        """Limite superior do balde que contém o percentil (estimativa conservadora)."""
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[i], self.max_ms) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self, elapsed_s):
+        return {
+            "count": self.count,
+            "per_s": round(self.count / elapsed_s, 2) if elapsed_s else None,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p90_ms": round(self.percentile(0.9), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            # Tempo no estágio por segundo de relógio, somado entre threads (1 = um thread o tempo todo)
+            "busy": round(self.total_ms / 1000 / elapsed_s, 3) if elapsed_s else None,
+        }
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start)
+
+
+class Profiler:
+    """Perfil configurado por 'config'; sem config (None), fica sempre desligado."""
+
+    def __init__(self, config=None):
+        self.mode = None if config is None else _mode(config)
+        config = config or {}
+        self.enabled = self.mode is not None
+        self.interval = config.get("profile_interval_s", 30)
+        self.path = config.get("profile_path", os.path.join(BASE_DIR, "profile.json"))
+        self.trace_path = config.get("profile_trace")
+        self.stacks_path = config.get("profile_stacks", os.path.join(BASE_DIR, "profile_stacks.txt"))
+        self.cprofile_path = config.get("profile_cprofile", os.path.join(BASE_DIR, "profile.prof"))
+        self.sample_interval = config.get("profile_sample_ms", 10) / 1000
+        self.stages = collections.defaultdict(StageStats)
+        self.events = collections.deque(maxlen=config.get("profile_trace_events", 200000)) if self.trace_path else None
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._profiles = []
+        self._local = threading.local()
+
+    # --- Medição ---
+
+    def stage(self, name):
+        """Contexto que mede o bloco como o estágio 'name'."""
+        return _Timer(self, name) if self.enabled else _NULL
+
+    def record(self, name, start, end=None, thread=None):
+        """Registra um intervalo medido com time.perf_counter() (fim padrão: agora).
+
+        'thread' dá nome ao trilho do trace quando o trabalho rodou fora deste
+        processo (ex.: lotes nos processos de detecção).
+        """
+        if not self.enabled:
+            return
+        end = time.perf_counter() if end is None else end
+        with self._lock:
+            self.stages[name].add((end - start) * 1000)
+            if self.events is not None:
+                self.events.append((name, start, end, thread or threading.current_thread().name))
+
+    def call(self, function, *args, **kwargs):
+        """Chama 'function'; no modo cprofile, sob o cProfile deste thread."""
+        if self.mode != "cprofile" or not self.enabled:
+            return function(*args, **kwargs)
+        entry = getattr(self._local, "entry", None)
+        if entry is None:
+            # [perfil, profundidade]: chamadas aninhadas não religam nem desligam o perfil do thread
+            entry = self._local.entry = [cProfile.Profile(), 0]
+            with self._lock:
+                self._profiles.append(entry)
+        entry[1] += 1
+        if entry[1] == 1:
+            entry[0].enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].disable()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        if not self.enabled:
+            return
+        print(f"Perfil ligado (modo {self.mode}); resumo a cada {self.interval:g} s em {self.path}")
+        self._threads = [threading.Thread(target=self._dump_loop, daemon=True, name="perfil")]
+        if self.mode == "sample":
+            self._threads.append(threading.Thread(target=self._sample_loop, daemon=True, name="perfil-amostras"))
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self.dump()
+        self.enabled = False
+        if self.mode == "cprofile":
+            # Um perfil só pode ser lido desligado: threads ainda dentro de uma chamada ficam de fora
+            with self._lock:
+                profiles = [profile for profile, depth in self._profiles if depth == 0]
+            if profiles:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(self.cprofile_path)
+                print(f"cProfile gravado em {self.cprofile_path} ({len(profiles)} thread(s))")
+
+    # --- Resumos ---
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            stages = {name: stats.summary(elapsed) for name, stats in sorted(self.stages.items())}
+        return {"mode": self.mode, "elapsed_s": round(elapsed, 1), "stages": stages}
+
+    def dump(self):
+        summary = self.summary()
+        busiest = sorted(summary["stages"].items(), key=lambda item: -(item[1]["busy"] or 0))[:6]
+        print("[perfil] " + " | ".join(f"{name}: {s['mean_ms']:.2f} ms (p99 {s['p99_ms']:.1f}), "
+                                       f"{s['per_s']}/s, {s['busy']:.0%} ocupado" for name, s in busiest))
+        self._write_json(self.path, summary)
+        if self.events is not None:
+            self._write_json(self.trace_path, self.chrome_trace())
+        if self.mode == "sample":
+            with self._lock:
+                lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+            self._write_text(self.stacks_path, "\n".join(lines) + "\n")
+
+    def chrome_trace(self):
+        """Eventos no formato de trace do Chrome (JSON Object Format, eventos 'X')."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        tids = {}
+        trace = []
+        for name, start, end, thread in events:
+            if thread not in tids:
+                tids[thread] = len(tids) + 1
+                trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[thread],
+                              "args": {"name": thread}})
+            trace.append({"name": name, "ph": "X", "pid": pid, "tid": tids[thread],
+                          "ts": round((start - self.started) * 1e6, 1), "dur": round((end - start) * 1e6, 1)})
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    @staticmethod
+    def _write_json(path, data):
+        Profiler._write_text(path, json.dumps(data, ensure_ascii=False))
+
+    @staticmethod
+    def _write_text(path, text):
+        # Temporário + rename: quem lê o arquivo durante a execução nunca vê metade dele
+        try:
+            with open(path + ".tmp", 'w', encoding="utf-8") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+        except OSError as error:
+            print(f"[perfil] Não foi possível gravar {path}: {error}")
+
+    def _dump_loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.dump()
+
+    def _sample_loop(self):
+        """Amostrador de pilhas de todos os threads, no estilo do py-spy."""
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            collected = []
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                collected.append(";".join([names.get(ident, str(ident))] + stack[::-1]))
+            del frames
+            with self._lock:
+                self.stacks.update(collected)
+                self.samples += 1
+
+
+# --- Perfil do processo ---
+# Um único perfil por processo, para os módulos instrumentarem sem receber o objeto.
+
+_profiler = Profiler()
+
+
+def configure(config=None):
+    """Troca o perfil do processo pelo do config (e encerra o anterior)."""
+    global _profiler
+    previous = _profiler
+    _profiler = Profiler(config or {})
+    previous.close()
+    _profiler.start()
+    return _profiler
+
+
+def current():
+    return _profiler
+
+
+def stage(name):
+    return _profiler.stage(name)
+
+
+def record(name, start, end=None, thread=None):
+    _profiler.record(name, start, end, thread)
+
+
+def call(function, *args, **kwargs):
+    return _profiler.call(function, *args, **kwargs)
+
+
+def profiled(function):
+    """Decorador: a função roda sob cProfile quando o perfil do processo está no modo cprofile."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return _profiler.call(function, *args, **kwargs)
+    return wrapper
+
+
+def close():
+    _profiler.close()
@@ -0,0 +1,251 @@
+"""Gravação de clipes de evento a partir do stream comprimido, sem recodificar.
+
+Um segundo ffmpeg copia os pacotes da câmera (-c copy) em segmentos MPEG-TS curtos
+num diretório de buffer, que guarda só os últimos segundos. Quando trigger() é
+chamado (pessoa detectada), o gravador junta os segmentos do pré-evento até o fim
+do pós-evento num único clipe .ts. Novas detecções durante o pós-evento estendem o
+mesmo clipe, até 'clip_max_length' segundos. Como nada é decodificado, o custo de
+CPU não depende de quantos eventos acontecem.
+
+Chaves do config.json:
+    record_clips       liga a gravação (padrão false)
+    clip_dir           onde os clipes ficam (padrão "clips" ao lado do script)
+    clip_pre_roll      segundos antes da detecção (padrão 10)
+    clip_post_roll     segundos depois da última detecção (padrão 10)
+    clip_segment_time  duração de cada segmento do buffer (padrão 2, mínimo 1: os
+                       nomes têm resolução de 1 s; o corte só acontece em
+                       keyframes, então o GOP da câmera manda)
+    clip_max_length    duração máxima de um clipe (padrão 120)
+    clip_max_mb        espaço total dos clipes; os mais antigos saem primeiro (padrão 1024)
+    clip_buffer_dir    diretório do buffer (padrão no diretório temporário; um
+                       tmpfs como /dev/shm evita escrita em disco)
+    clip_audio         copia também o áudio (padrão false: muitas câmeras mandam
+                       G.711, que o MPEG-TS não aceita)
+"""
+import glob
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from ingest import input_options
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Cada execução do segmentador tem seu prefixo: um reinício no mesmo segundo não
+# sobrescreve o segmento anterior
+SEGMENT_PATTERN = "{run:04d}_%Y%m%d-%H%M%S.ts"
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def build_segment_command(url, config, pattern):
+    """Comando ffmpeg que copia o stream em segmentos MPEG-TS nomeados pelo horário de início."""
+    # Do perfil de ingestão só valem as opções de entrada: não há decodificação
+    command = ['ffmpeg', '-loglevel', 'error'] + input_options(url, config, parts=("rtsp", "demux"))
+    command += ['-i', url, '-map', '0:v:0']
+    if config.get("clip_audio"):
+        command += ['-map', '0:a?']
+    command += [
+        '-c', 'copy', '-f', 'segment', '-segment_time', f'{max(1.0, float(config.get("clip_segment_time", 2))):g}',
+        '-segment_format', 'mpegts', '-strftime', '1', pattern
+    ]
+    return command
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+class ClipRecorder:
+    def __init__(self, url, config, name="camera"):
+        self.url = url
+        self.config = config
+        self.name = name
+        self.pre_roll = config.get("clip_pre_roll", 10)
+        self.post_roll = config.get("clip_post_roll", 10)
+        self.segment_time = max(1, config.get("clip_segment_time", 2))
+        self.max_length = config.get("clip_max_length", 120)
+        self.max_bytes = config.get("clip_max_mb", 1024) * 1024 * 1024
+        self.clip_dir = config.get("clip_dir") or os.path.join(BASE_DIR, "clips")
+        buffer_root = config.get("clip_buffer_dir") or tempfile.gettempdir()
+        self.buffer_dir = os.path.join(buffer_root, f"house_cam_{_safe_name(name)}")
+
+        self.stop_event = threading.Event()
+        self.process = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # Evento aberto: [início, fim] em horário de parede (time.time())
+        self._event = None
+        self._last_clip_end = 0.0
+
+        # Métricas
+        self.clips_saved = 0
+        self.clips_evicted = 0
+        self.segmenter_restarts = 0
+
+    # --- API ---
+
+    def start(self):
+        os.makedirs(self.clip_dir, exist_ok=True)
+        shutil.rmtree(self.buffer_dir, ignore_errors=True)
+        os.makedirs(self.buffer_dir, exist_ok=True)
+        self.stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"recorder-{self.name}")
+        self._thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def trigger(self, timestamp=None):
+        """Marca uma detecção no instante 'timestamp' (padrão: agora)."""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            if self._event is None:
+                start = max(timestamp - self.pre_roll, self._last_clip_end)
+                self._event = [start, timestamp + self.post_roll]
+            else:
+                start = self._event[0]
+                self._event[1] = min(max(self._event[1], timestamp + self.post_roll), start + self.max_length)
+
+    def metrics(self):
+        return {
+            "clips_saved": self.clips_saved,
+            "clips_evicted": self.clips_evicted,
+            "segmenter_restarts": self.segmenter_restarts,
+            "recording": self._event is not None,
+        }
+
+    # --- Segmentador ---
+
+    def _run(self):
+        backoff = 1
+        next_start = 0.0
+        while not self.stop_event.wait(0.5):
+            if self.process is None or self.process.poll() is not None:
+                if self.process is not None:
+                    print(f"[{self.name}] Gravador de segmentos encerrou (código {self.process.returncode}).")
+                    self.process = None
+                    self.segmenter_restarts += 1
+                    next_start = time.monotonic() + backoff
+                    backoff = min(backoff * 2, 60)
+                if time.monotonic() >= next_start:
+                    self._start_segmenter()
+            elif backoff > 1 and self._segments():
+                backoff = 1
+            self._finish_event()
+            self._prune_buffer()
+
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        self._finish_event(force=True)
+        shutil.rmtree(self.buffer_dir, ignore_errors=True)
+
+    def _start_segmenter(self):
+        pattern = os.path.join(self.buffer_dir, SEGMENT_PATTERN.format(run=self.segmenter_restarts))
+        try:
+            self.process = subprocess.Popen(build_segment_command(self.url, self.config, pattern),
+                                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            print(f"[{self.name}] ffmpeg não encontrado; gravação de clipes desativada.")
+            self.stop_event.set()
+
+    def _segments(self):
+        """[(caminho, início, fim)] em ordem; o último pode estar sendo escrito."""
+        segments = []
+        for path in sorted(glob.glob(os.path.join(self.buffer_dir, "*.ts"))):
+            try:
+                stamp = os.path.basename(path)[:-3].partition("_")[2]
+                start = time.mktime(time.strptime(stamp, SEGMENT_TIME_FORMAT))
+                segments.append((path, start, os.path.getmtime(path)))
+            except (ValueError, OSError):
+                continue
+        return segments
+
+    def _prune_buffer(self):
+        segments = self._segments()
+        with self._lock:
+            keep_from = time.time() - self.pre_roll - self.segment_time
+            if self._event is not None:
+                keep_from = min(keep_from, self._event[0])
+        # O segmento mais recente nunca sai: o ffmpeg ainda está escrevendo nele
+        for path, _, end in segments[:-1]:
+            if end < keep_from:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # --- Clipes ---
+
+    def _finish_event(self, force=False):
+        with self._lock:
+            event = self._event
+        if event is None:
+            return
+        start, end = event
+        segments = self._segments()
+        writing = self.process is not None and self.process.poll() is None
+        complete = segments[:-1] if writing else segments
+        # Espera o segmento que contém o fim do evento fechar (com folga se o stream parou)
+        closed = any(seg_start > end for _, seg_start, _ in segments)
+        if not force and not closed and time.time() < end + 3 * self.segment_time + 5:
+            return
+        with self._lock:
+            end = self._event[1]
+            self._event = None
+            self._last_clip_end = end
+        parts = [path for path, seg_start, seg_end in complete if seg_end >= start and seg_start <= end]
+        if parts:
+            self._write_clip(parts, start)
+
+    def _write_clip(self, parts, start):
+        base = f"{_safe_name(self.name)}_{time.strftime(SEGMENT_TIME_FORMAT, time.localtime(start))}"
+        # Criação exclusiva: dois clipes começando no mesmo segundo ganham sufixos -1, -2...
+        for attempt in itertools.count():
+            clip_path = os.path.join(self.clip_dir, f"{base}-{attempt}.ts" if attempt else f"{base}.ts")
+            try:
+                out = open(clip_path, 'xb')
+                break
+            except FileExistsError:
+                continue
+        # Segmentos MPEG-TS do mesmo stream podem ser concatenados byte a byte
+        with out:
+            for path in parts:
+                try:
+                    with open(path, 'rb') as segment:
+                        shutil.copyfileobj(segment, out)
+                except OSError:
+                    continue
+        self.clips_saved += 1
+        print(f"[{self.name}] Clipe salvo: {clip_path}")
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        """Remove os clipes mais antigos até o diretório caber em clip_max_mb."""
+        clips = []
+        for path in glob.glob(os.path.join(self.clip_dir, "*.ts")):
+            try:
+                clips.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+        clips.sort()
+        total = sum(size for _, size, _ in clips)
+        for _, size, path in clips[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.clips_evicted += 1
@@ -0,0 +1,167 @@
+"""Agendador de análise adaptativo: rápido quando há atividade, quase parado quando não há.
+
+Cada câmera tem uma taxa-alvo de análise (quadros por segundo que vão para a rede).
+Movimento (filtro de movimento) ou pessoa detectada levam a taxa a
+'analysis_active_fps' por 'activity_hold_s' segundos; depois ela decai
+exponencialmente (meia-vida 'activity_decay_s') até 'analysis_idle_fps'. Os quadros
+que chegam antes da hora são descartados antes de qualquer custo de rede, mas não
+antes da decodificação: o ffmpeg precisa entregar quadros na taxa ativa, então com
+a cena parada a decodificação custa o mesmo que com atividade.
+
+Com 'inference_budget_ms', todas as câmeras dividem um orçamento de inferência em
+milissegundos de rede por segundo de relógio (1000 = um núcleo ocupado o tempo
+todo). A demanda é a soma de taxa-alvo x custo medido por quadro de cada câmera; se
+passar do orçamento, todas as taxas caem na mesma proporção, e as câmeras com
+atividade continuam com a maior parte.
+
+Chaves do config.json (por câmera, exceto o orçamento, que é global):
+    adaptive_sampling     liga o agendador (padrão false: taxa fixa, capture_interval
+                          na janela e sample_fps no engine.py)
+    analysis_idle_fps     taxa com a cena parada (padrão 0.5)
+    analysis_active_fps   taxa com atividade recente (padrão 5; limitada pelos
+                          quadros que o ffmpeg entrega, ver sample_fps)
+    activity_hold_s       segundos na taxa ativa depois da última atividade (padrão 10)
+    activity_decay_s      meia-vida do decaimento até a taxa ociosa (padrão 5)
+    inference_budget_ms   ms de inferência por segundo somando todas as câmeras
+                          (padrão: sem limite; só vale para câmeras adaptativas)
+"""
+import collections
+import threading
+import time
+
+IDLE_FPS = 0.5
+ACTIVE_FPS = 5
+# Janela das métricas de taxa efetiva e uso do orçamento, em segundos
+WINDOW_S = 10
+REBALANCE_S = 0.5
+
+
+class CameraRate:
+    """Estado de agendamento de uma câmera; criado por SamplingScheduler.add()."""
+
+    def __init__(self, name, config, fixed_fps=None):
+        self.name = name
+        self.adaptive = config.get("adaptive_sampling", False)
+        self.idle_fps = config.get("analysis_idle_fps", IDLE_FPS)
+        self.active_fps = config.get("analysis_active_fps", ACTIVE_FPS)
+        self.hold = config.get("activity_hold_s", 10)
+        self.half_life = config.get("activity_decay_s", 5)
+        # Sem o agendador a taxa é fixa (None = todo quadro entregue é analisado)
+        self.fixed_fps = fixed_fps
+        self.last_activity = float("-inf")
+        # Horário "agendado" da última análise: absorve o jitter sem passar da taxa média
+        self.slot = float("-inf")
+        # Fator do orçamento global (1 = sem corte)
+        self.scale = 1.0
+        # Custo médio de rede por quadro, em ms
+        self.cost_ms = 0.0
+        self.analyzed = collections.deque()
+
+    def note_activity(self, now=None):
+        """Movimento ou pessoa: volta à taxa ativa."""
+        self.last_activity = time.monotonic() if now is None else now
+
+    def target_fps(self, now):
+        """Taxa antes do orçamento (None = sem limite)."""
+        if not self.adaptive:
+            return self.fixed_fps
+        quiet = now - self.last_activity - self.hold
+        if quiet <= 0:
+            return self.active_fps
+        return self.idle_fps + (self.active_fps - self.idle_fps) * 0.5 ** (quiet / self.half_life)
+
+    def active(self, now):
+        return now - self.last_activity <= self.hold
+
+
+class SamplingScheduler:
+    """Decide, por câmera, se o quadro que chegou vai para a rede, dentro do orçamento global."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.budget_ms = config.get("inference_budget_ms")
+        self.rates = []
+        self.scale = 1.0
+        self.demand_ms = 0.0
+        self._costs = collections.deque()
+        self._lock = threading.Lock()
+        self._next_rebalance = 0.0
+
+    def add(self, name, config, fixed_fps=None):
+        rate = CameraRate(name, config, fixed_fps)
+        with self._lock:
+            self.rates.append(rate)
+        return rate
+
+    def _interval(self, rate, now):
+        fps = rate.target_fps(now)
+        if fps is None:
+            return 0.0
+        fps *= rate.scale
+        return 1 / fps if fps > 0 else float("inf")
+
+    def due(self, rate, now=None):
+        """True se já é hora de analisar um quadro desta câmera."""
+        now = time.monotonic() if now is None else now
+        if now >= self._next_rebalance:
+            self._rebalance(now)
+        # O intervalo é o da taxa atual: atividade nova vale já no próximo quadro
+        return now - rate.slot >= self._interval(rate, now)
+
+    def mark(self, rate, now=None):
+        """Registra que um quadro desta câmera foi enviado à rede."""
+        now = time.monotonic() if now is None else now
+        interval = self._interval(rate, now)
+        # Avança um intervalo a partir do horário agendado (não do quadro, que chega
+        # atrasado por causa do jitter), sem acumular crédito além de meio intervalo
+        rate.slot = max(rate.slot + interval, now - interval / 2) if interval else now
+        with self._lock:
+            rate.analyzed.append(now)
+            while now - rate.analyzed[0] > WINDOW_S:
+                rate.analyzed.popleft()
+
+    def record(self, rate, cost_ms, now=None):
+        """Custo de rede de um quadro analisado (entra na demanda e no uso do orçamento)."""
+        now = time.monotonic() if now is None else now
+        rate.cost_ms = 0.8 * rate.cost_ms + 0.2 * cost_ms if rate.cost_ms else cost_ms
+        with self._lock:
+            self._costs.append((now, cost_ms))
+            while now - self._costs[0][0] > WINDOW_S:
+                self._costs.popleft()
+
+    def _rebalance(self, now):
+        with self._lock:
+            self._next_rebalance = now + REBALANCE_S
+            adaptive = [rate for rate in self.rates if rate.adaptive]
+            self.demand_ms = sum(rate.target_fps(now) * rate.cost_ms for rate in adaptive)
+            if self.budget_ms and self.demand_ms > self.budget_ms:
+                self.scale = self.budget_ms / self.demand_ms
+            else:
+                self.scale = 1.0
+            for rate in adaptive:
+                rate.scale = self.scale
+
+    def camera_metrics(self, rate, now=None):
+        now = time.monotonic() if now is None else now
+        target = rate.target_fps(now)
+        with self._lock:
+            recent = sum(1 for t in rate.analyzed if now - t <= WINDOW_S)
+        return {
+            "target_fps": None if target is None else round(target * rate.scale, 2),
+            "effective_fps": round(recent / WINDOW_S, 2),
+            "frame_cost_ms": round(rate.cost_ms, 1),
+            "active": rate.active(now),
+        }
+
+    def metrics(self):
+        now = time.monotonic()
+        with self._lock:
+            used = sum(cost for t, cost in self._costs if now - t <= WINDOW_S) / WINDOW_S
+        return {
+            "budget_ms": self.budget_ms,
+            "demand_ms": round(self.demand_ms, 1),
+            "used_ms": round(used, 1),
+            "budget_use": round(used / self.budget_ms, 3) if self.budget_ms else None,
+            "scale": round(self.scale, 3),
+            "cameras": {rate.name: self.camera_metrics(rate, now) for rate in self.rates},
+        }
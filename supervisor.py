@@ -0,0 +1,284 @@
+"""Supervisão do ffmpeg: reconecta só quando o stream realmente falha.
+
+Falhas reconhecidas:
+    stall               nenhum quadro completo em 'stall_timeout' segundos (o ffmpeg é morto)
+    gap                 intervalo entre quadros maior que 'max_frame_gap' (se configurado)
+    short_read          o fluxo terminou no meio de um quadro
+    exit                o ffmpeg encerrou
+    resolution_timeout  a resolução não apareceu em 'resolution_timeout' segundos
+    resolution_mismatch a conexão mostrou uma resolução diferente da que estava em cache
+
+Sem resolução de análise configurada, o tamanho do quadro vem do ffprobe (em cache
+por URL, ver probe.py); o log do ffmpeg só é usado se o ffprobe falhar ou com
+"probe": false.
+
+Entre tentativas a espera cresce exponencialmente (reconnect_backoff_initial até
+reconnect_backoff_max) com jitter, e volta ao início depois que a conexão fica
+saudável por 'healthy_after' segundos. Com "reconnect": false (replay de arquivo)
+o fim do stream encerra a leitura: read() passa a devolver None e 'finished' fica True.
+"""
+import collections
+import random
+import subprocess
+import threading
+import time
+
+from ingest import analysis_size, build_ffmpeg_command, FrameRing, input_options, pipe_buffer_size
+from probe import PROBE_CACHE, resolution_from_log
+
+
+class StreamSupervisor:
+    def __init__(self, url, config, stop_event, ring_slots=3, name="ffmpeg", log_ffmpeg=True,
+                 on_connect=None, on_status=None):
+        self.url = url
+        self.config = config
+        self.stop_event = stop_event
+        self.ring_slots = ring_slots
+        self.name = name
+        self.log_ffmpeg = log_ffmpeg
+        self.on_connect = on_connect
+        self.on_status = on_status
+
+        sample_fps = config.get("sample_fps")
+        # Com amostragem lenta um quadro pode demorar; o limite acompanha o intervalo esperado
+        self.stall_timeout = config.get("stall_timeout", max(10, 3 / sample_fps if sample_fps else 0))
+        self.max_frame_gap = config.get("max_frame_gap")
+        self.resolution_timeout = config.get("resolution_timeout", 15)
+        self.backoff_initial = config.get("reconnect_backoff_initial", 1)
+        self.backoff_max = config.get("reconnect_backoff_max", 60)
+        self.healthy_after = config.get("healthy_after", 30)
+        self.use_probe = config.get("probe", True)
+        self.reconnect = config.get("reconnect", True)
+        self.finished = False
+        self.probe_cache = PROBE_CACHE
+
+        self.pipe = None
+        self.ring = None
+        self.detected_resolution = None
+        self.expected_resolution = None
+        self.stream_info = None
+        self._resolution_ready = threading.Event()
+        self._attempt = 0
+        self._stalled = False
+        self._pending_failure = None
+        self._connect_started = 0.0
+        self._awaiting_first_frame = False
+        self._healthy_since = 0.0
+        self._last_frame = 0.0
+        self._down_since = None
+        self._lock = threading.Lock()
+        self._watchdog = None
+
+        # Métricas
+        self.reconnects = 0
+        self.downtime = 0.0
+        self.time_to_first_frame = None
+        self.failures = collections.Counter()
+
+    # --- API ---
+
+    def read(self, skip=False):
+        """Próximo quadro do stream, reconectando sozinho quando ele falha.
+
+        Com skip=True o quadro é consumido sem ser entregue. Retorna None quando o
+        quadro foi pulado ou descartado pelo anel, ou quando o monitoramento parou.
+        Lança FileNotFoundError se o ffmpeg não estiver instalado.
+        """
+        while not self.stop_event.is_set() and not self.finished:
+            if self._pending_failure is not None:
+                self._fail(self._pending_failure)
+                continue
+            if self.ring is None and not self._connect():
+                continue
+            try:
+                if skip:
+                    self.ring.skip(self.pipe.stdout)
+                    frame = None
+                else:
+                    frame = self.ring.read(self.pipe.stdout)
+            except EOFError:
+                if not self.stop_event.is_set():
+                    self._fail(self._failure_reason())
+                continue
+            self._on_frame()
+            return frame
+        self.close()
+        return None
+
+    def close(self):
+        with self._lock:
+            if self.pipe is not None:
+                self.pipe.terminate()
+
+    def metrics(self):
+        downtime = self.downtime
+        if self._down_since is not None:
+            downtime += time.monotonic() - self._down_since
+        return {
+            "reconnects": self.reconnects,
+            "downtime_s": round(downtime, 1),
+            "time_to_first_frame_s": None if self.time_to_first_frame is None else round(self.time_to_first_frame, 2),
+            "failures": dict(self.failures),
+            "stream": self.stream_info._asdict() if self.stream_info is not None else None,
+        }
+
+    # --- Conexão ---
+
+    def _status(self, text):
+        if self.on_status is not None:
+            self.on_status(text)
+
+    def _backoff_delay(self):
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** (self._attempt - 1))
+        # Jitter: evita que várias câmeras reconectem todas no mesmo instante
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _connect(self):
+        if self._attempt:
+            delay = self._backoff_delay()
+            print(f"[{self.name}] Nova tentativa de conexão em {delay:.1f} s...")
+            if self.stop_event.wait(delay):
+                return False
+        self._attempt += 1
+
+        print(f"[{self.name}] Iniciando nova conexão com a câmera...")
+        self._status("Iniciando conexão...")
+        self._connect_started = time.monotonic()
+        self._stalled = False
+        self._resolution_ready.clear()
+        self.detected_resolution = None
+        self.expected_resolution = None
+
+        # Resolução: configurada > cache/ffprobe > log do ffmpeg (último recurso)
+        size = analysis_size(self.config)
+        if size is None and self.use_probe:
+            # Sem os limites de sondagem do perfil: o ffprobe precisa ver o stream inteiro
+            self.stream_info = self.probe_cache.get(self.url, input_options(self.url, self.config, parts=("rtsp",)))
+            if self.stream_info is not None:
+                size = (self.stream_info.width, self.stream_info.height)
+                self.expected_resolution = size
+                info = self.stream_info
+                print(f"[{self.name}] Stream: {info.codec} {info.width}x{info.height} {info.fps or 0:g} fps {info.pix_fmt}")
+        if self.stop_event.is_set():
+            return False
+
+        with self._lock:
+            self.pipe = subprocess.Popen(build_ffmpeg_command(self.url, self.config),
+                                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                         bufsize=pipe_buffer_size(self.config))
+        threading.Thread(target=self._read_stderr, args=(self.pipe.stderr,), daemon=True).start()
+
+        # Com a resolução conhecida não é preciso esperar o stderr
+        if size is not None:
+            self.detected_resolution = size
+        else:
+            stderr_closed = self._resolution_ready.wait(self.resolution_timeout)
+            if self.stop_event.is_set():
+                return False
+            if self.detected_resolution is None:
+                # stderr fechado sem resolução: o ffmpeg encerrou antes do primeiro quadro
+                if not stderr_closed:
+                    self._status("Timeout ao detectar resolução.")
+                self._fail("exit" if stderr_closed else "resolution_timeout")
+                return False
+
+        width, height = self.detected_resolution
+        self.ring = FrameRing(width, height, slots=self.ring_slots)
+        self._awaiting_first_frame = True
+        self._last_frame = time.monotonic()
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, daemon=True)
+            self._watchdog.start()
+        return True
+
+    def _read_stderr(self, pipe_stderr):
+        # Só a linha do stream de saída (o mapeado, já com os filtros) diz o tamanho dos
+        # quadros no pipe; os streams de entrada listam também os que não são decodificados
+        in_output = False
+        for line in iter(pipe_stderr.readline, b''):
+            line_str = line.decode('utf-8', errors='ignore').strip()
+            if self.log_ffmpeg:
+                print(f"[{self.name}] {line_str}")
+
+            if line_str.startswith(("Input #", "Output #")):
+                in_output = line_str.startswith("Output #")
+                continue
+            if not in_output:
+                continue
+            resolution = resolution_from_log(line_str)
+            if resolution is None:
+                continue
+            if self.detected_resolution is None:
+                print(f"SUCESSO: Resolução detectada automaticamente: {resolution[0]}x{resolution[1]}")
+                self.detected_resolution = resolution
+                self._resolution_ready.set()
+            elif self.expected_resolution is not None and resolution != self.expected_resolution:
+                # A câmera mudou de resolução: o cache não vale mais e os quadros estão desalinhados
+                print(f"[{self.name}] Resolução mudou para {resolution[0]}x{resolution[1]}; sondando de novo.")
+                self.probe_cache.invalidate(self.url)
+                self.expected_resolution = None
+                self._pending_failure = "resolution_mismatch"
+        pipe_stderr.close()
+        self._resolution_ready.set()
+
+    def _watch(self):
+        """Mata o ffmpeg se nenhum quadro chegar a tempo, ou quando o monitoramento para."""
+        while not self.stop_event.wait(0.5):
+            if self.ring is not None and time.monotonic() - self._last_frame > self.stall_timeout:
+                with self._lock:
+                    if self.pipe is not None and self.pipe.poll() is None:
+                        self._stalled = True
+                        self.pipe.kill()
+        self.close()
+
+    def _on_frame(self):
+        now = time.monotonic()
+        if self._awaiting_first_frame:
+            self._awaiting_first_frame = False
+            self.time_to_first_frame = now - self._connect_started
+            self._healthy_since = now
+            if self._down_since is not None:
+                self.downtime += now - self._down_since
+                self._down_since = None
+            print(f"[{self.name}] Primeiro quadro em {self.time_to_first_frame:.2f} s.")
+            self._status("Monitorando...")
+            if self.on_connect is not None:
+                self.on_connect()
+        elif self.max_frame_gap and now - self._last_frame > self.max_frame_gap:
+            # O quadro é entregue, mas a próxima leitura já reconecta
+            self._pending_failure = "gap"
+        if self._attempt and now - self._healthy_since > self.healthy_after:
+            self._attempt = 0
+        self._last_frame = now
+
+    def _failure_reason(self):
+        if self._stalled:
+            return "stall"
+        if self.ring is not None and self.ring.partial:
+            return "short_read"
+        return "exit"
+
+    def _fail(self, reason):
+        self._pending_failure = None
+        if not self.reconnect:
+            self.finished = True
+            self.close()
+            self.ring = None
+            print(f"[{self.name}] Fim do stream ({reason}).")
+            return
+        self.failures[reason] += 1
+        self.reconnects += 1
+        if self._down_since is None:
+            # Num travamento a câmera já estava fora desde o último quadro
+            self._down_since = self._last_frame if reason == "stall" else time.monotonic()
+        with self._lock:
+            if self.pipe is not None:
+                self.pipe.terminate()
+                try:
+                    self.pipe.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.pipe.kill()
+            self.pipe = None
+        self.ring = None
+        print(f"[{self.name}] Falha no stream ({reason}). Reconectando...")
+        self._status("Reconectando...")
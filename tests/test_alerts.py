@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from alerts import AlertEvent, Sink, TokenBucket
+
+
+class RecordingSink(Sink):
+    def __init__(self, options, default_rate=60):
+        super().__init__(options, default_rate)
+        self.notifications = []
+
+    def send(self, notification):
+        self.notifications.append(notification)
+
+
+def _wait_for(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_token_bucket_limits_rate_and_refills():
+    bucket = TokenBucket(rate=2, burst=1)
+    assert bucket.take()
+    assert not bucket.take()
+    assert 0.4 < bucket.wait_time() <= 0.5
+    # Meio segundo depois, a ficha volta
+    bucket._updated -= 0.5
+    assert bucket.wait_time() == 0.0
+    assert bucket.take()
+
+
+def test_token_bucket_burst_caps_accumulated_tokens():
+    bucket = TokenBucket(rate=1, burst=3)
+    bucket._updated -= 60
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_burst_of_events_becomes_one_notification():
+    sink = RecordingSink({"coalesce_s": 0.2, "rate_per_minute": 600})
+    sink.start()
+    try:
+        now = time.time()
+        for i in range(5):
+            sink.offer(AlertEvent(f"camera{i % 2 + 1}", 1, now + i))
+        _wait_for(lambda: sink.sent)
+    finally:
+        sink.stop_event.set()
+        sink.join(timeout=1)
+    assert len(sink.notifications) == 1
+    notification = sink.notifications[0]
+    assert notification["events"] == 5
+    assert notification["cameras"] == {"camera1": 3, "camera2": 2}
+    assert sink.coalesced == 4
+
+
+def test_events_waiting_for_a_token_are_coalesced():
+    sink = RecordingSink({"coalesce_s": 0, "rate_per_minute": 60})
+    sink.bucket.tokens = 0.7
+    sink.start()
+    try:
+        for i in range(3):
+            sink.offer(AlertEvent("camera1", 1, time.time()))
+        _wait_for(lambda: sink.sent)
+    finally:
+        sink.stop_event.set()
+        sink.join(timeout=1)
+    assert [n["events"] for n in sink.notifications] == [3]
+
+
+def test_full_queue_drops_and_counts():
+    sink = RecordingSink({"queue_size": 2})
+    for _ in range(5):
+        sink.offer(AlertEvent("camera1", 1, time.time()))
+    assert sink.dropped == 3
+    assert sink.metrics()["pending"] == 2
+
+
+def test_sink_without_send_cannot_be_created():
+    with pytest.raises(TypeError):
+        Sink({}, 60)
@@ -0,0 +1,6 @@
+from daemon import label_value
+
+
+def test_label_value_escapes_prometheus_specials():
+    assert label_value('sala "norte"\\1\nfundo') == 'sala \\"norte\\"\\\\1\\nfundo'
+    assert label_value("garagem") == "garagem"
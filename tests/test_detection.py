@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import pytest
+
+from detection import get_detector, make_batch_blob, model_files_exist, split_detections
+from engine import MonitoringEngine
+
+
+def test_split_detections_by_image_id():
+    rows = np.array([
+        [0, 15, 0.9, 0.1, 0.1, 0.2, 0.2],
+        [2, 15, 0.8, 0.3, 0.3, 0.4, 0.4],
+        [0, 7, 0.6, 0.5, 0.5, 0.6, 0.6],
+    ], np.float32)
+    parts = split_detections(rows[np.newaxis, np.newaxis], 3)
+    assert len(parts) == 3
+    assert [part.shape for part in parts] == [(1, 1, 2, 7), (1, 1, 0, 7), (1, 1, 1, 7)]
+    assert parts[0][0, 0, :, 1].tolist() == [15, 7]
+    assert parts[2][0, 0, 0, 2] == pytest.approx(0.8)
+
+
+def test_batch_blob_shape_with_mixed_sizes():
+    images = [np.zeros((360, 640, 3), np.uint8), np.zeros((300, 300, 3), np.uint8)]
+    assert make_batch_blob(images, 300).shape == (2, 3, 300, 300)
+
+
+@pytest.mark.skipif(not model_files_exist(), reason="modelo MobileNet-SSD não encontrado")
+def test_batch_matches_single_image_detection():
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (300, 300, 3), dtype=np.uint8) for _ in range(3)]
+    detector = get_detector({})
+    batch = detector.detect_batch(images)
+    for image, detections in zip(images, batch):
+        single = detector.detect(image)[0, 0]
+        single = single[single[:, 2] > 0.2]
+        batched = detections[0, 0]
+        batched = batched[batched[:, 2] > 0.2]
+        assert batched.shape == single.shape
+        np.testing.assert_allclose(batched[:, 1:], single[:, 1:], atol=1e-3)
+
+
+def test_unknown_target_is_reported_on_load():
+    with pytest.raises(RuntimeError, match="dnn_target"):
+        get_detector({"dnn_target": "gpu"})
+
+
+@pytest.mark.skipif(not model_files_exist() or len(cv2.dnn.getAvailableTargets(cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE)) > 0,
+                    reason="modelo ausente ou OpenVINO disponível")
+def test_unavailable_backend_fails_engine_start_before_forking():
+    engine = MonitoringEngine({"cameras": [{"url": "camera.mp4", "dnn_backend": "openvino"}], "alert_sinks": []})
+    with pytest.raises(RuntimeError, match="openvino"):
+        engine.start()
+    assert engine.processes == [] and engine.cameras == []
@@ -0,0 +1,123 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+from alerts import AlertBus
+from detection import model_settings
+from engine import CameraWorker, MonitoringEngine, detection_worker, load_cameras
+from postprocess import Detections
+from scheduler import IDLE_FPS, SamplingScheduler
+
+ZONE = [[0.5, 0.1], [0.9, 0.1], [0.9, 0.5], [0.5, 0.5]]
+
+
+def test_cameras_with_zones_keep_native_resolution():
+    plain, zoned = load_cameras({"cameras": [{}, {"zones": [ZONE]}]})
+    assert (plain["analysis_width"], plain["analysis_height"]) == (640, 360)
+    assert "analysis_width" not in zoned and "analysis_height" not in zoned
+
+
+def test_explicit_analysis_size_is_kept_with_zones():
+    (camera,) = load_cameras({"cameras": [{"zones": [ZONE], "analysis_width": 1280, "analysis_height": 720}]})
+    assert (camera["analysis_width"], camera["analysis_height"]) == (1280, 720)
+
+
+def _network_rounds(detect_every, seconds=120, fps=5):
+    """Quadros enviados à rede com a cena parada e uma trilha aberta, em relógio simulado."""
+    engine = types.SimpleNamespace(stop_event=threading.Event(), batch_size=4, scheduler=SamplingScheduler())
+    (camera,) = load_cameras({"cameras": [{"url": "camera.mp4", "adaptive_sampling": True,
+                                              "detect_every": detect_every}]})
+    worker = CameraWorker(0, camera, engine)
+    worker.tracker.update(Detections(np.array([[100, 100, 140, 220]], np.int32),
+                                     np.array([0.9], np.float32), np.array([15], np.int32)))
+    image = np.zeros((camera["analysis_height"], camera["analysis_width"], 3), np.uint8)
+    return sum(worker._regions(image, None, now=1000 + i / fps) is not None for i in range(int(seconds * fps)))
+
+
+def test_detect_every_divides_network_rounds():
+    every_frame = _network_rounds(1)
+    assert every_frame == pytest.approx(120 * IDLE_FPS, abs=2)
+    assert _network_rounds(4) == pytest.approx(every_frame / 4, abs=2)
+
+
+class FakeFrame:
+    def __init__(self, shape=(360, 640, 3)):
+        self.array = np.zeros(shape, np.uint8)
+        self.timestamp = time.time()
+        self.released = 0
+
+    def release(self):
+        self.released += 1
+
+
+def _engine_with_camera(on_result=None):
+    config = {"cameras": [{"url": "camera.mp4"}], "alert_sinks": []}
+    engine = MonitoringEngine(config, workers=1, on_result=on_result)
+    engine.scheduler = SamplingScheduler()
+    engine.alerts = AlertBus(config)
+    engine.results = queue.Queue()
+    engine.cameras = [CameraWorker(0, engine.cameras_config[0], engine)]
+    return engine, engine.cameras[0]
+
+
+def _in_flight(engine, camera, sequence):
+    frame = FakeFrame()
+    camera.in_flight[sequence] = (frame, [None])
+    engine.in_flight_total += 1
+    return frame
+
+
+def test_result_loop_survives_errors():
+    calls = []
+
+    def on_result(camera, frame, found):
+        calls.append(frame)
+        if len(calls) == 1:
+            raise RuntimeError("falha no callback")
+
+    engine, camera = _engine_with_camera(on_result)
+    frames = [_in_flight(engine, camera, sequence) for sequence in range(4)]
+    empty = np.zeros((1, 1, 0, 7), np.float32)
+    engine.results.put(([(0, 0)], [empty], 10.0, None))
+    engine.results.put(([(0, 1)], [empty], 10.0, None))
+    engine.results.put(([(0, 2), (0, 3)], None, 0.0, "RuntimeError: backend indisponível"))
+    engine.results.put(None)
+    engine._result_loop()
+    assert calls == frames[:2]
+    assert camera.frames_analyzed == 2
+    assert camera.errors == 3
+    assert engine.batch_errors == 1
+    assert camera.in_flight == {} and engine.in_flight_total == 0
+    assert [frame.released for frame in frames] == [1, 1, 1, 1]
+
+
+def test_detection_worker_reports_batch_errors():
+    tasks, results = queue.Queue(), queue.Queue()
+    settings = model_settings({"model_path": "nao_existe.caffemodel"})
+    tasks.put((settings, [(0, 0)], [np.zeros((300, 300, 3), np.uint8)]))
+    tasks.put(None)
+    detection_worker(tasks, results, [settings])
+    keys, detections, _, error = results.get_nowait()
+    assert keys == [(0, 0)] and detections is None and error
+
+
+def test_dead_worker_is_restarted_and_in_flight_frames_released():
+    engine, camera = _engine_with_camera()
+    engine.tasks, engine.results = mp.Queue(), mp.Queue()
+    frame = _in_flight(engine, camera, 0)
+    engine.processes = [types.SimpleNamespace(exitcode=-9, is_alive=lambda: False)]
+    engine._spawn_worker = lambda: types.SimpleNamespace(exitcode=None, is_alive=lambda: True)
+    engine._check_workers()
+    assert engine.worker_restarts == 1 and engine.pool_stats()["workers_alive"] == 1
+    assert camera.in_flight == {} and engine.in_flight_total == 0
+    assert frame.released == 1 and camera.errors == 1
+    # O resultado atrasado do quadro descartado é ignorado
+    engine.results.put(([(0, 0)], [np.zeros((1, 1, 0, 7), np.float32)], 10.0, None))
+    engine.results.put(None)
+    engine._result_loop()
+    assert frame.released == 1 and camera.frames_analyzed == 0
@@ -0,0 +1,35 @@
+import threading
+
+from pipeline import LatestQueue, Stage
+
+
+def test_drop_oldest_keeps_latest_and_releases_dropped():
+    dropped = []
+    q = LatestQueue(1, "drop_oldest", on_drop=dropped.append)
+    q.put(1)
+    q.put(2)
+    assert q.get(timeout=0) == 2
+    assert dropped == [1] and q.drops == 1
+
+
+def test_stage_survives_exception_and_releases_item():
+    released = []
+    stop = threading.Event()
+    inbox = LatestQueue(4, "block", on_drop=released.append)
+    outbox = LatestQueue(4, "block")
+
+    def function(item):
+        if item == "bad":
+            raise ValueError("falha de teste")
+        return item.upper()
+
+    stage = Stage("teste", inbox, function, outbox, stop)
+    stage.start()
+    for item in ("a", "bad", "b"):
+        inbox.put(item, stop)
+    results = [outbox.get(timeout=2) for _ in range(2)]
+    stop.set()
+    stage.join(timeout=2)
+    assert results == ["A", "B"]
+    assert released == ["bad"]
+    assert stage.errors == 1 and stage.processed == 2
@@ -0,0 +1,38 @@
+import numpy as np
+
+from postprocess import Detections, nms
+
+
+def test_nms_suppresses_overlapping_boxes_of_same_class():
+    boxes = np.array([[0, 0, 100, 100], [5, 5, 105, 105], [300, 300, 400, 400]], np.int32)
+    scores = np.array([0.9, 0.8, 0.7], np.float32)
+    class_ids = np.array([15, 15, 15])
+    assert sorted(nms(boxes, scores, class_ids, 0.45)) == [0, 2]
+
+
+def test_nms_keeps_overlapping_boxes_of_different_classes():
+    boxes = np.array([[0, 0, 100, 100], [0, 0, 100, 100]], np.int32)
+    scores = np.array([0.9, 0.8], np.float32)
+    assert sorted(nms(boxes, scores, np.array([15, 7]), 0.45)) == [0, 1]
+
+
+def test_nms_class_shift_with_negative_coordinates():
+    # Caixa na borda esquerda (x negativo): com o deslocamento antigo (max + 1 por classe),
+    # a caixa da classe 1 caía exatamente sobre a da classe 0 e era suprimida
+    boxes = np.array([[-100, 0, 10, 10], [-111, 0, -1, 10]], np.int32)
+    scores = np.array([0.9, 0.8], np.float32)
+    assert sorted(nms(boxes, scores, np.array([0, 1]), 0.45)) == [0, 1]
+
+
+def test_nms_empty():
+    assert len(nms(np.empty((0, 4), np.int32), np.empty(0, np.float32), np.empty(0, np.int64), 0.45)) == 0
+
+
+def test_concatenate_and_select():
+    a = Detections(np.array([[0, 0, 10, 10]], np.int32), np.array([0.9], np.float32), np.array([15]))
+    b = Detections(np.array([[5, 5, 20, 20]], np.int32), np.array([0.6], np.float32), np.array([7]))
+    found = Detections.concatenate([a, Detections.empty(), b])
+    assert len(found) == 2
+    assert found.count(15) == 1
+    kept = found.select(found.scores > 0.7)
+    assert len(kept) == 1 and kept.class_ids[0] == 15
@@ -0,0 +1,32 @@
+import pytest
+
+from probe import _parse_rate, probe_options, resolution_from_log
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("Stream #0:0: Video: h264 (High), yuv420p(progressive), 1920x1080 [SAR 1:1 DAR 16:9], 25 fps", (1920, 1080)),
+    ("Stream #0:0(und): Video: rawvideo (BGR[24] / 0x18524742), bgr24(pc, progressive), 640x360, q=2-31", (640, 360)),
+    ("Stream #0:1: Audio: aac (LC), 48000 Hz, stereo, fltp", None),
+    ("Stream #0:0 -> #0:0 (h264 (native) -> rawvideo (native))", None),
+    ("Video: h264, 1920x1080", None),
+])
+def test_resolution_from_log(line, expected):
+    assert resolution_from_log(line) == expected
+
+
+@pytest.mark.parametrize("rate, expected", [
+    ("25/1", 25.0),
+    ("30000/1001", pytest.approx(29.97, abs=0.01)),
+    ("0/0", None),
+    ("", None),
+    (None, None),
+    ("abc", None),
+])
+def test_parse_rate(rate, expected):
+    assert _parse_rate(rate) == expected
+
+
+def test_probe_options_drops_ffmpeg_only_options():
+    options = ["-re", "-stream_loop", "-1", "-rtsp_transport", "tcp", "-f", "lavfi"]
+    assert probe_options(options) == ["-rtsp_transport", "tcp", "-f", "lavfi"]
+    assert probe_options([]) == []
@@ -0,0 +1,33 @@
+import os
+import time
+
+from recorder import SEGMENT_PATTERN, ClipRecorder
+
+
+def test_clips_in_the_same_second_do_not_overwrite(tmp_path):
+    recorder = ClipRecorder("rtsp://camera", {"clip_dir": str(tmp_path / "clips"),
+                                              "clip_buffer_dir": str(tmp_path)}, name="sala")
+    os.makedirs(recorder.clip_dir)
+    parts = []
+    for content in (b"primeiro", b"segundo"):
+        part = tmp_path / f"{content.decode()}.ts"
+        part.write_bytes(content)
+        parts.append(str(part))
+    start = time.time()
+    recorder._write_clip(parts[:1], start)
+    recorder._write_clip(parts[1:], start)
+    clips = sorted(os.listdir(recorder.clip_dir))
+    assert len(clips) == 2
+    assert {(tmp_path / "clips" / name).read_bytes() for name in clips} == {b"primeiro", b"segundo"}
+
+
+def test_segments_of_each_segmenter_run_keep_their_start(tmp_path):
+    recorder = ClipRecorder("rtsp://camera", {"clip_buffer_dir": str(tmp_path)}, name="sala")
+    os.makedirs(recorder.buffer_dir)
+    start = time.mktime(time.localtime())
+    for run in (0, 1):
+        name = time.strftime(SEGMENT_PATTERN.format(run=run), time.localtime(start))
+        open(os.path.join(recorder.buffer_dir, name), 'wb').close()
+    segments = recorder._segments()
+    assert len(segments) == 2
+    assert [segment[1] for segment in segments] == [start, start]
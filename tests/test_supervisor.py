@@ -0,0 +1,189 @@
+import io
+import threading
+import time
+import types
+
+import supervisor as supervisor_module
+from ingest import build_ffmpeg_command
+from supervisor import StreamSupervisor
+
+# Log de um MP4 com capa anexada: um segundo stream de vídeo que não é decodificado
+LOG = b"""Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'camera.mp4':
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), 1280x720 [SAR 1:1 DAR 16:9], 25 fps
+  Stream #0:1[0x0]: Video: mjpeg (Baseline), yuvj420p(pc, bt470bg/unknown/unknown), 640x360, 90k tbn (attached pic)
+Stream mapping:
+  Stream #0:0 -> #0:0 (h264 (native) -> rawvideo (native))
+Output #0, rawvideo, to 'pipe:':
+  Stream #0:0(und): Video: rawvideo (BGR[24] / 0x18524742), bgr24(pc, progressive), 1280x720 [SAR 1:1 DAR 16:9], q=2-31, 25 fps
+"""
+
+
+def make_supervisor(**config):
+    return StreamSupervisor("camera.mp4", dict(config), threading.Event(), log_ffmpeg=False)
+
+
+def test_frame_command_maps_first_video_stream():
+    for config in ({}, {"sample_fps": 1, "analysis_width": 640, "analysis_height": 360}):
+        command = build_ffmpeg_command("camera.mp4", config)
+        assert command[command.index("-map") + 1] == "0:v:0"
+
+
+def test_extra_input_video_stream_is_not_a_resolution_change():
+    supervisor = make_supervisor()
+    supervisor.expected_resolution = (1280, 720)
+    supervisor.detected_resolution = (1280, 720)
+    supervisor._read_stderr(io.BytesIO(LOG))
+    assert supervisor._pending_failure is None
+    assert supervisor.expected_resolution == (1280, 720)
+
+
+def test_resolution_is_detected_from_the_output_stream():
+    supervisor = make_supervisor()
+    supervisor._read_stderr(io.BytesIO(LOG.replace(b"bgr24(pc, progressive), 1280x720", b"bgr24, 960x540")))
+    assert supervisor.detected_resolution == (960, 540)
+
+
+def test_output_resolution_change_invalidates_probe():
+    supervisor = make_supervisor()
+    supervisor.expected_resolution = (1920, 1080)
+    supervisor.detected_resolution = (1920, 1080)
+    supervisor._read_stderr(io.BytesIO(LOG))
+    assert supervisor._pending_failure == "resolution_mismatch"
+
+
+class FakePipe:
+    """Processo do ffmpeg falso: 'frames' quadros completos e, opcionalmente, meio quadro."""
+
+    def __init__(self, frames, width, height, partial=False, log=b""):
+        size = width * height * 3
+        self.stdout = io.BytesIO(bytes(size * frames + (size // 2 if partial else 0)))
+        self.stderr = io.BytesIO(log)
+        self.terminated = False
+
+    def poll(self):
+        return 0 if self.terminated else None
+
+    def terminate(self):
+        self.terminated = True
+
+    def kill(self):
+        self.terminated = True
+
+    def wait(self, timeout=None):
+        return 0
+
+
+def fake_ffmpeg(monkeypatch, pipes):
+    """Cada conexão do supervisor recebe o próximo FakePipe da lista."""
+    pipes = list(pipes)
+    monkeypatch.setattr(supervisor_module.subprocess, "Popen", lambda *args, **kwargs: pipes.pop(0))
+
+
+def read_all(supervisor, limit=100):
+    frames = 0
+    for _ in range(limit):
+        frame = supervisor.read()
+        if frame is None:
+            if supervisor.finished or supervisor.stop_event.is_set():
+                break
+            continue
+        frames += 1
+        frame.release()
+    return frames
+
+
+def wrap_stop_after(supervisor, fail, count):
+    """Para o supervisor depois de 'count' falhas (sem mais conexões falsas para entregar)."""
+    calls = []
+
+    def wrapped(reason):
+        calls.append(reason)
+        fail(reason)
+        if len(calls) >= count:
+            supervisor.stop_event.set()
+    return wrapped
+
+
+SIZE = {"analysis_width": 8, "analysis_height": 6}
+
+
+def test_backoff_doubles_up_to_the_limit_with_jitter(monkeypatch):
+    supervisor = make_supervisor(reconnect_backoff_initial=1, reconnect_backoff_max=8)
+    for attempt, full in ((1, 1), (2, 2), (3, 4), (4, 8), (6, 8)):
+        supervisor._attempt = attempt
+        monkeypatch.setattr(supervisor_module.random, "uniform", lambda low, high: 0)
+        assert supervisor._backoff_delay() == full / 2
+        monkeypatch.setattr(supervisor_module.random, "uniform", lambda low, high: high)
+        assert supervisor._backoff_delay() == full
+
+
+def test_failure_reason_classification():
+    supervisor = make_supervisor()
+    assert supervisor._failure_reason() == "exit"
+    supervisor.ring = types.SimpleNamespace(partial=100)
+    assert supervisor._failure_reason() == "short_read"
+    supervisor._stalled = True
+    assert supervisor._failure_reason() == "stall"
+
+
+def test_stall_counts_downtime_from_last_frame():
+    supervisor = make_supervisor()
+    pipe = supervisor.pipe = FakePipe(0, 8, 6)
+    supervisor._last_frame = time.monotonic() - 20
+    supervisor._fail("stall")
+    assert supervisor.failures == {"stall": 1} and supervisor.reconnects == 1
+    assert pipe.terminated and supervisor.pipe is None and supervisor.ring is None
+    assert supervisor.metrics()["downtime_s"] >= 20
+    supervisor._fail("exit")
+    # Ainda fora: o início da queda não muda
+    assert supervisor.failures == {"stall": 1, "exit": 1} and supervisor.metrics()["downtime_s"] >= 20
+
+
+def test_first_frame_closes_downtime_and_calls_on_connect():
+    connected = []
+    supervisor = make_supervisor()
+    supervisor.on_connect = lambda: connected.append(True)
+    supervisor._down_since = time.monotonic() - 5
+    supervisor._connect_started = time.monotonic() - 1
+    supervisor._awaiting_first_frame = True
+    supervisor._on_frame()
+    assert connected == [True]
+    assert supervisor._down_since is None and supervisor.downtime >= 5
+    assert supervisor.time_to_first_frame >= 1
+
+
+def test_frame_gap_schedules_reconnect():
+    supervisor = make_supervisor(max_frame_gap=0.5)
+    supervisor._last_frame = time.monotonic()
+    supervisor._on_frame()
+    assert supervisor._pending_failure is None
+    supervisor._last_frame = time.monotonic() - 1
+    supervisor._on_frame()
+    assert supervisor._pending_failure == "gap"
+
+
+def test_attempts_reset_after_healthy_period():
+    supervisor = make_supervisor(healthy_after=30)
+    supervisor._attempt = 4
+    supervisor._healthy_since = time.monotonic() - 10
+    supervisor._on_frame()
+    assert supervisor._attempt == 4
+    supervisor._healthy_since = time.monotonic() - 31
+    supervisor._on_frame()
+    assert supervisor._attempt == 0
+
+
+def test_end_of_stream_without_reconnect(monkeypatch):
+    fake_ffmpeg(monkeypatch, [FakePipe(5, 8, 6)])
+    supervisor = make_supervisor(reconnect=False, **SIZE)
+    assert read_all(supervisor) == 5
+    assert supervisor.finished and supervisor.reconnects == 0
+    supervisor.stop_event.set()
+
+
+def test_short_read_reconnects_and_keeps_reading(monkeypatch):
+    fake_ffmpeg(monkeypatch, [FakePipe(3, 8, 6, partial=True), FakePipe(4, 8, 6)])
+    supervisor = make_supervisor(reconnect_backoff_initial=0.01, **SIZE)
+    monkeypatch.setattr(supervisor, "_fail", wrap_stop_after(supervisor, supervisor._fail, 2))
+    assert read_all(supervisor) == 7
+    assert supervisor.failures == {"short_read": 1, "exit": 1} and supervisor.reconnects == 2
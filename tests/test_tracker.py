@@ -0,0 +1,84 @@
+import numpy as np
+
+from postprocess import Detections, PERSON_CLASS_ID
+from tracker import Tracker, iou_matrix, tracks_to_detections
+
+
+def people(*boxes, class_id=PERSON_CLASS_ID):
+    return Detections(np.array(boxes, np.int32).reshape(-1, 4), np.full(len(boxes), 0.9, np.float32),
+                      np.full(len(boxes), class_id, np.int32))
+
+
+def test_iou_matrix():
+    iou = iou_matrix(np.array([[0, 0, 10, 10]]), np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]]))
+    np.testing.assert_allclose(iou, [[1.0, 50 / 150, 0.0]])
+
+
+def test_first_sighting_alerts_once():
+    tracker = Tracker({})
+    tracks, entered = tracker.update(people([100, 100, 140, 220]))
+    assert len(tracks) == 1 and entered == tracks
+    # A mesma pessoa parada não alerta de novo
+    tracks, entered = tracker.update(people([102, 101, 142, 221]))
+    assert len(tracks) == 1 and entered == []
+    assert tracker.total_confirmed == 1
+
+
+def test_single_sighting_followed_by_empty_frames_is_counted():
+    tracker = Tracker({})
+    _, entered = tracker.update(people([100, 100, 140, 220]))
+    assert len(entered) == 1
+    assert len(tracker.update(people())[0]) == 1
+
+
+def test_min_hits_delays_confirmation():
+    tracker = Tracker({"track_min_hits": 2})
+    assert tracker.update(people([100, 100, 140, 220])) == ([], [])
+    tracks, entered = tracker.update(people([104, 100, 144, 220]))
+    assert len(entered) == 1 and entered == tracks
+
+
+def test_fast_walker_matches_by_center_distance():
+    tracker = Tracker({})
+    (track,), _ = tracker.update(people([100, 100, 140, 220]))
+    # Sem sobreposição, mas dentro de 0.75 diagonal (~95 px)
+    tracks, entered = tracker.update(people([160, 110, 200, 230]))
+    assert [t.track_id for t in tracks] == [track.track_id] and entered == []
+    # Longe demais: pessoa nova
+    _, entered = tracker.update(people([500, 100, 540, 220]))
+    assert len(entered) == 1 and entered[0].track_id != track.track_id
+
+
+def test_classes_are_not_associated():
+    tracker = Tracker({})
+    tracker.update(people([100, 100, 140, 220]))
+    _, entered = tracker.update(people([100, 100, 140, 220], class_id=PERSON_CLASS_ID + 1))
+    assert len(entered) == 1 and len(tracker.tracks) == 2
+
+
+def test_tracks_end_after_max_missed():
+    tracker = Tracker({"track_max_missed": 2})
+    tracker.update(people([100, 100, 140, 220]))
+    for _ in range(2):
+        assert len(tracker.update(people())[0]) == 1
+    assert tracker.update(people()) == ([], [])
+    assert tracker.tracks == []
+
+
+def test_needs_detection_every_k_frames_with_tracks():
+    tracker = Tracker({"detect_every": 3})
+    assert [tracker.needs_detection() for _ in range(3)] == [True, True, True]
+    tracker.update(people([100, 100, 140, 220]))
+    tracker._frames = 0
+    assert [tracker.needs_detection() for _ in range(6)] == [True, False, False, True, False, False]
+
+
+def test_predict_moves_tracks_by_last_velocity():
+    tracker = Tracker({"detect_every": 2})
+    tracker.update(people([100, 100, 140, 220]))
+    tracker.update(people([110, 100, 150, 220]))
+    (track,) = tracker.predict()
+    np.testing.assert_allclose(track.box, [115, 100, 155, 220])
+    found = tracks_to_detections([track])
+    assert found.boxes.tolist() == [[115, 100, 155, 220]]
+    assert len(tracks_to_detections([])) == 0
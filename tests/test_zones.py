@@ -0,0 +1,73 @@
+import numpy as np
+
+from postprocess import Detections, PERSON_CLASS_ID
+from zones import ZoneLayout
+
+
+def people(*boxes, scores=None):
+    scores = scores or [0.9] * len(boxes)
+    return Detections(np.array(boxes, np.int32).reshape(-1, 4), np.array(scores, np.float32),
+                      np.full(len(boxes), PERSON_CLASS_ID, np.int32))
+
+
+def inside(tile, w, h):
+    x1, y1, x2, y2 = tile
+    return 0 <= x1 < x2 <= w and 0 <= y1 < y2 <= h
+
+
+def test_tiles_cover_zone_at_network_resolution():
+    layout = ZoneLayout({"zones": [[[0.5, 0.1], [0.95, 0.1], [0.95, 0.5], [0.5, 0.5]]], "zone_max_tiles": 50})
+    tiles = layout.tiles(2560, 1440)
+    assert tiles and all(inside(tile, 2560, 1440) for tile in tiles)
+    assert {x2 - x1 for x1, _, x2, _ in tiles} == {300}
+    assert min(t[0] for t in tiles) <= 1280 and max(t[2] for t in tiles) >= 2432
+    assert min(t[1] for t in tiles) <= 144 and max(t[3] for t in tiles) >= 720
+
+
+def test_zone_outside_frame_is_dropped(capsys):
+    layout = ZoneLayout({"zones": [[[1000, 100], [1900, 100], [1900, 400], [1000, 400]]]})
+    assert layout.tiles(640, 360) == []
+    assert "fora do quadro" in capsys.readouterr().out
+
+
+def test_zone_partly_outside_frame_is_clipped():
+    layout = ZoneLayout({"zones": [[[400, 50], [1900, 50], [1900, 400], [400, 400]]]})
+    tiles = layout.tiles(640, 360)
+    assert tiles and all(inside(tile, 640, 360) for tile in tiles)
+
+
+def test_roi_selects_intersecting_tiles():
+    layout = ZoneLayout({"zones": [[[0, 0], [1, 0], [1, 1], [0, 1]]], "zone_max_tiles": 20})
+    everything = layout.tiles(1280, 720)
+    moving = layout.tiles(1280, 720, roi=(0, 0, 50, 50))
+    assert 0 < len(moving) < len(everything)
+    assert all(x1 < 50 and y1 < 50 for x1, y1, _, _ in moving)
+
+
+def test_max_tiles_grows_tile_side():
+    layout = ZoneLayout({"zones": [[[0, 0], [1, 0], [1, 1], [0, 1]]], "zone_max_tiles": 4})
+    tiles = layout.tiles(1280, 720)
+    assert len(tiles) <= 4
+    assert all(inside(tile, 1280, 720) for tile in tiles)
+
+
+def test_only_exclusions_analyse_whole_frame():
+    layout = ZoneLayout({"exclude_zones": [[[0, 0], [100, 0], [100, 100], [0, 100]]]})
+    assert layout.tiles(640, 360) == [(0, 0, 640, 360)]
+    assert layout.tiles(640, 360, roi=(10, 10, 50, 50)) == [(10, 10, 50, 50)]
+
+
+def test_accept_uses_foot_point_and_exclusions():
+    layout = ZoneLayout({"zones": [[[0, 200], [640, 200], [640, 360], [0, 360]]],
+                         "exclude_zones": [[[500, 0], [640, 0], [640, 360], [500, 360]]]})
+    found = people([100, 50, 140, 250], [100, 10, 140, 150], [550, 50, 590, 250])
+    kept = layout.accept(found, 640, 360)
+    assert kept.boxes.tolist() == [[100, 50, 140, 250]]
+    assert len(layout.accept(Detections.empty(), 640, 360)) == 0
+
+
+def test_merge_removes_duplicates_across_tiles():
+    layout = ZoneLayout({"zones": [[[0, 0], [1, 0], [1, 1], [0, 1]]]})
+    merged = layout.merge([people([100, 100, 140, 220], scores=[0.9]),
+                           people([102, 101, 142, 221], [400, 100, 440, 220], scores=[0.8, 0.7])])
+    assert sorted(merged.boxes.tolist()) == [[100, 100, 140, 220], [400, 100, 440, 220]]
@@ -0,0 +1,211 @@
+"""Rastreamento leve entre quadros: IDs estáveis, contagem sem oscilar e alerta por entrada.
+
+Cada detecção da rede é associada às trilhas existentes da mesma classe por IoU
+(guloso, da maior sobreposição para a menor); o que sobra é associado pela
+distância entre centros, que cobre pessoas andando com amostragem lenta. Trilhas
+sem par ganham um ID novo e só contam depois de 'track_min_hits' detecções (com o
+padrão 1 a pessoa conta e alerta já na primeira vez; o ID só evita repetir o alerta
+enquanto ela fica na cena); trilhas que ficam 'track_max_missed' rodadas da rede sem
+par são encerradas.
+
+Entre rodadas da rede (detect_every > 1) predict() move as trilhas: por fluxo
+óptico (Lucas-Kanade em cantos dentro da caixa) com "track_optical_flow": true,
+ou pela última velocidade conhecida.
+
+Chaves do config.json:
+    tracking              liga o rastreamento (padrão true)
+    detect_every          roda a rede a cada K quadros analisados (padrão 1)
+    track_iou_threshold   IoU mínimo para associar (padrão 0.3)
+    track_max_distance    distância máxima entre centros, em diagonais da caixa (padrão 0.75)
+    track_min_hits        detecções para confirmar uma trilha (padrão 1; 2 ou mais
+                          descarta falsos positivos isolados, mas quem aparece
+                          num só quadro analisado nunca alerta e o alerta
+                          atrasa um intervalo de análise)
+    track_max_missed      rodadas da rede sem par antes de encerrar (padrão 3)
+    track_optical_flow    usa fluxo óptico entre rodadas da rede (padrão false)
+"""
+import itertools
+
+import cv2
+import numpy as np
+
+from postprocess import Detections
+
+
+def iou_matrix(a, b):
+    """IoU entre cada caixa de 'a' (Nx4) e de 'b' (Mx4)."""
+    a = a.astype(np.float32)[:, None]
+    b = b.astype(np.float32)[None]
+    w = (np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])).clip(0)
+    h = (np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])).clip(0)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+def _greedy_pairs(score, valid):
+    """Pares (linha, coluna) escolhidos do maior score para o menor, só onde 'valid'."""
+    pairs = []
+    score = np.where(valid, score, -np.inf)
+    while score.size and np.isfinite(score.max()):
+        row, col = np.unravel_index(np.argmax(score), score.shape)
+        pairs.append((row, col))
+        score[row, :] = -np.inf
+        score[:, col] = -np.inf
+    return pairs
+
+
+class Track:
+    __slots__ = ("track_id", "box", "center", "class_id", "score", "hits", "missed", "velocity", "confirmed")
+
+    def __init__(self, track_id, box, class_id, score):
+        self.track_id = track_id
+        self.box = box.astype(np.float32)
+        # Centro na última detecção da rede (a caixa pode ter sido movida por predict())
+        self.center = (self.box[:2] + self.box[2:]) / 2
+        self.class_id = class_id
+        self.score = score
+        self.hits = 1
+        self.missed = 0
+        self.velocity = np.zeros(2, np.float32)
+        self.confirmed = False
+
+    def shift(self, dx, dy):
+        self.box += np.array([dx, dy, dx, dy], np.float32)
+
+
+class Tracker:
+    def __init__(self, config=None):
+        config = config or {}
+        self.detect_every = max(1, int(config.get("detect_every", 1)))
+        self.iou_threshold = config.get("track_iou_threshold", 0.3)
+        self.max_distance = config.get("track_max_distance", 0.75)
+        self.min_hits = config.get("track_min_hits", 1)
+        self.max_missed = config.get("track_max_missed", 3)
+        self.optical_flow = bool(config.get("track_optical_flow", False))
+        self.tracks = []
+        self._ids = itertools.count(1)
+        self._frames = 0
+        self._gray = None
+        # Trilhas confirmadas desde o início (uma por pessoa que entrou na cena)
+        self.total_confirmed = 0
+
+    def reset(self):
+        """Esquece as trilhas (ex.: depois de uma reconexão)."""
+        self.tracks = []
+        self._frames = 0
+        self._gray = None
+
+    def needs_detection(self):
+        """Se o próximo quadro deve passar pela rede (sempre, quando não há trilhas)."""
+        run = self._frames % self.detect_every == 0 or not self.tracks
+        self._frames += 1
+        return run
+
+    # --- Atualização com a rede ---
+
+    def update(self, found, frame=None):
+        """Associa as detecções da rede às trilhas.
+
+        Devolve (trilhas confirmadas, trilhas confirmadas agora). 'frame' (BGR) só é
+        usado pelo fluxo óptico, como referência para o próximo predict().
+        """
+        boxes = found.boxes
+        pairs = []
+        if self.tracks and len(found):
+            track_boxes = np.array([track.box for track in self.tracks], np.float32)
+            same_class = np.array([track.class_id for track in self.tracks])[:, None] == found.class_ids[None]
+            iou = iou_matrix(track_boxes, boxes)
+            pairs = _greedy_pairs(iou, same_class & (iou >= self.iou_threshold))
+            # Sem sobreposição suficiente: centro mais próximo, dentro de uma fração da diagonal
+            free = same_class.copy()
+            for row, col in pairs:
+                free[row, :] = False
+                free[:, col] = False
+            centers_t = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+            centers_d = (boxes[:, :2] + boxes[:, 2:]).astype(np.float32) / 2
+            distance = np.linalg.norm(centers_t[:, None] - centers_d[None], axis=2)
+            diagonal = np.linalg.norm(track_boxes[:, 2:] - track_boxes[:, :2], axis=1)[:, None]
+            pairs += _greedy_pairs(-distance, free & (distance <= self.max_distance * np.maximum(diagonal, 1)))
+
+        for row, col in pairs:
+            self._match(self.tracks[row], boxes[col], found.scores[col])
+        matched_tracks = {row for row, _ in pairs}
+        matched_dets = {col for _, col in pairs}
+        for row, track in enumerate(self.tracks):
+            if row not in matched_tracks:
+                track.missed += 1
+        for col in range(len(found)):
+            if col not in matched_dets:
+                self.tracks.append(Track(next(self._ids), boxes[col], int(found.class_ids[col]), float(found.scores[col])))
+
+        entered = []
+        for track in self.tracks:
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                self.total_confirmed += 1
+                entered.append(track)
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        if self.optical_flow and frame is not None:
+            self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self.confirmed(), entered
+
+    def _match(self, track, box, score):
+        box = box.astype(np.float32)
+        center = (box[:2] + box[2:]) / 2
+        track.velocity = (center - track.center) / self.detect_every
+        track.center = center
+        track.box = box
+        track.score = float(score)
+        track.hits += 1
+        track.missed = 0
+
+    # --- Entre rodadas da rede ---
+
+    def predict(self, frame=None):
+        """Move as trilhas para o quadro atual sem rodar a rede; devolve as confirmadas."""
+        if self.optical_flow and frame is not None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if self._gray is not None and self._gray.shape == gray.shape:
+                for track in self.tracks:
+                    shift = self._flow_shift(self._gray, gray, track.box)
+                    if shift is not None:
+                        track.velocity = shift
+            self._gray = gray
+        for track in self.tracks:
+            track.shift(*track.velocity)
+        return self.confirmed()
+
+    @staticmethod
+    def _flow_shift(previous, current, box):
+        """Deslocamento mediano de cantos dentro da caixa (Lucas-Kanade), ou None."""
+        h, w = previous.shape
+        x1, y1 = max(0, int(box[0])), max(0, int(box[1]))
+        x2, y2 = min(w, int(box[2])), min(h, int(box[3]))
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return None
+        points = cv2.goodFeaturesToTrack(previous[y1:y2, x1:x2], maxCorners=20, qualityLevel=0.01, minDistance=5)
+        if points is None:
+            return None
+        points = points + np.array([x1, y1], np.float32)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, current, points, None)
+        ok = status.ravel() == 1
+        if not ok.any():
+            return None
+        return np.median((moved - points)[ok].reshape(-1, 2), axis=0).astype(np.float32)
+
+    # --- Saída ---
+
+    def confirmed(self):
+        """Trilhas confirmadas e ainda vivas."""
+        return [track for track in self.tracks if track.confirmed]
+
+
+def tracks_to_detections(tracks):
+    """Detections com as caixas atuais das trilhas (na mesma ordem)."""
+    if not tracks:
+        return Detections.empty()
+    return Detections(np.array([track.box for track in tracks]).round().astype(np.int32),
+                      np.array([track.score for track in tracks], np.float32),
+                      np.array([track.class_id for track in tracks], np.int32))
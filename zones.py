@@ -0,0 +1,153 @@
+"""Zonas poligonais por câmera: inferência só nas zonas, em blocos na resolução da rede.
+
+Em vez de reduzir o quadro inteiro para a entrada da rede (uma pessoa longe numa
+câmera de 4 MP vira poucos pixels), cada zona é coberta por blocos quadrados do
+tamanho da entrada da rede, com sobreposição. Os blocos de todas as zonas ativas
+vão num único lote, as detecções voltam para as coordenadas do quadro, passam por
+NMS (uma pessoa na divisa de dois blocos aparece nos dois) e só ficam as que têm
+o ponto de apoio (centro da base da caixa) dentro de uma zona e fora das exclusões.
+
+Com o filtro de movimento, só as zonas que cruzam a região em movimento contam.
+
+Chaves do config.json (por câmera):
+    zones               lista de polígonos [[x, y], ...] ou {"name": ..., "points": [[x, y], ...]};
+                        coordenadas em pixels do quadro analisado ou normalizadas (0 a 1);
+                        o que passa da borda é recortado e zonas inteiras fora do
+                        quadro são ignoradas com um aviso
+    exclude_zones       polígonos ignorados (mesmo formato)
+    zone_tile_size      lado do bloco em pixels do quadro (padrão: input_size da rede)
+    zone_tile_overlap   sobreposição entre blocos vizinhos (padrão 0.2)
+    zone_max_tiles      máximo de blocos por quadro; acima disso os blocos crescem (padrão 8)
+    zone_nms_threshold  IoU do NMS entre blocos (padrão 0.45)
+"""
+import math
+
+import cv2
+import numpy as np
+
+import profiling
+from detection import INPUT_SIZE
+from postprocess import Detections, nms
+
+
+def _points(zone):
+    points = zone["points"] if isinstance(zone, dict) else zone
+    return np.array(points, np.float32).reshape(-1, 2)
+
+
+def _to_pixels(points, w, h):
+    if points.size and points.max() <= 1:
+        points = points * np.array([w, h], np.float32)
+    return points.round().astype(np.int32)
+
+
+def _positions(start, end, side, limit, overlap):
+    """Início de cada bloco para cobrir [start, end) com blocos de 'side', dentro de [0, limit)."""
+    length = end - start
+    if length <= side:
+        center = (start + end) // 2
+        return [min(max(0, center - side // 2), limit - side)]
+    count = math.ceil((length - side) / (side * (1 - overlap))) + 1
+    return [int(round(p)) for p in np.linspace(start, end - side, count)]
+
+
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class ZoneLayout:
+    def __init__(self, config=None):
+        config = config or {}
+        self.zones = [_points(zone) for zone in config.get("zones") or []]
+        self.exclusions = [_points(zone) for zone in config.get("exclude_zones") or []]
+        self.tile_size = int(config.get("zone_tile_size", config.get("input_size", INPUT_SIZE)))
+        self.overlap = config.get("zone_tile_overlap", 0.2)
+        self.max_tiles = config.get("zone_max_tiles", 8)
+        self.nms_threshold = config.get("zone_nms_threshold", 0.45)
+        self._size = None
+        self._mask = None
+        self._tiles = []
+
+    @property
+    def enabled(self):
+        return bool(self.zones or self.exclusions)
+
+    def _prepare(self, w, h):
+        """Máscara de zonas e blocos para um tamanho de quadro (refeito só se ele mudar)."""
+        if self._size == (w, h):
+            return
+        self._size = (w, h)
+        zones = [_to_pixels(points, w, h) for points in self.zones]
+        mask = np.zeros((h, w), np.uint8)
+        if zones:
+            cv2.fillPoly(mask, zones, 1)
+        else:
+            mask[:] = 1
+        if self.exclusions:
+            cv2.fillPoly(mask, [_to_pixels(points, w, h) for points in self.exclusions], 0)
+        self._mask = mask
+
+        if not zones:
+            # Só exclusões: o quadro inteiro vai para a rede, como antes
+            self._tiles = [(0, 0, w, h)]
+            return
+        # Limites das zonas recortados ao quadro: coordenadas em pixels de outra resolução
+        # (ou pontos fora da imagem) não podem gerar blocos vazios
+        bounds = []
+        for index, points in enumerate(zones):
+            x, y, bw, bh = cv2.boundingRect(points)
+            x1, y1, x2, y2 = max(0, x), max(0, y), min(w, x + bw), min(h, y + bh)
+            if x2 <= x1 or y2 <= y1:
+                print(f"Zona {index + 1} fora do quadro {w}x{h} (coordenadas em pixels de outra resolução?); ignorada.")
+                continue
+            bounds.append((x1, y1, x2 - x1, y2 - y1))
+        # Blocos na resolução da rede; se passarem do limite, crescem (e a rede reduz um pouco)
+        side = min(self.tile_size, w, h)
+        while True:
+            tiles = []
+            for (x, y, bw, bh) in bounds:
+                for ty in _positions(y, y + bh, side, h, self.overlap):
+                    for tx in _positions(x, x + bw, side, w, self.overlap):
+                        tiles.append((tx, ty, tx + side, ty + side))
+            if len(tiles) <= self.max_tiles or side >= min(w, h):
+                break
+            side = min(int(side * 1.25) + 1, w, h)
+        self._tiles = list(dict.fromkeys(tiles))
+
+    def tiles(self, w, h, roi=None):
+        """Blocos (x1, y1, x2, y2) a analisar; com 'roi', só os que cruzam a região em movimento."""
+        self._prepare(w, h)
+        if not self.zones and roi is not None:
+            return [tuple(roi)]
+        if roi is None:
+            return list(self._tiles)
+        return [tile for tile in self._tiles if _intersects(tile, roi)]
+
+    def merge(self, parts):
+        """Junta as detecções dos blocos (já em coordenadas do quadro) e remove as duplicadas."""
+        found = Detections.concatenate(parts)
+        if len(found) > 1:
+            found = found.select(nms(found.boxes, found.scores, found.class_ids, self.nms_threshold))
+        return found
+
+    def accept(self, found, w, h):
+        """Mantém as detecções com o ponto de apoio dentro de uma zona e fora das exclusões."""
+        if not len(found):
+            return found
+        self._prepare(w, h)
+        feet_x = ((found.boxes[:, 0] + found.boxes[:, 2]) // 2).clip(0, w - 1)
+        feet_y = (found.boxes[:, 3] - 1).clip(0, h - 1)
+        return found.select(self._mask[feet_y, feet_x].astype(bool))
+
+    def detect(self, detector, postprocess, frame, roi=None):
+        """Inferência em lote nos blocos das zonas ativas, com o resultado em coordenadas do quadro."""
+        (h, w) = frame.shape[:2]
+        tiles = self.tiles(w, h, roi)
+        if not tiles:
+            return Detections.empty()
+        crops = [frame[y1:y2, x1:x2] for (x1, y1, x2, y2) in tiles]
+        outputs = [detector.detect(crops[0])] if len(crops) == 1 else detector.detect_batch(crops)
+        with profiling.stage("postprocess"):
+            parts = [postprocess(output, x2 - x1, y2 - y1, origin=(x1, y1))
+                     for output, (x1, y1, x2, y2) in zip(outputs, tiles)]
+            return self.accept(self.merge(parts), w, h)